@@ -2,25 +2,215 @@
 Flask API for Premier League Midfielder Similarity Finder.
 Clean separation of concerns: this file only handles HTTP requests and responses.
 """
-from flask import Flask, jsonify, request
+import time
+_import_start = time.perf_counter()
+
+from flask import Flask, jsonify, request, g, Response, send_from_directory
 from flask_cors import CORS
 from datetime import datetime
 import sys
 import os
+import threading
+import numpy as np
+_flask_imported = time.perf_counter()
 
 # Add src to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.data_loader import load_real_data
-from src.model import PlayerSimilarityModel
+# pandas and scikit-learn are only imported when the model has to be
+# (re)trained; serving a persisted model needs numpy alone.
+from src.model import PlayerSimilarityModel, MAX_CACHED_NEIGHBOURS
+from src.admission import admission
+from src.metrics import metrics
+from src.profiling import profiler
+from src.responses import (
+    ALGORITHM_INFO, EXPLANATION_INFO, build_player_list, build_player_columns, build_similarity_table,
+    build_neighbour_table, build_map_columns, format_archetype, format_comparison, format_matrix_player,
+    format_player_details, format_similar_players, format_target_player, format_trajectory_matches
+)
+from src.response_formats import UnsupportedFormatError, negotiate, render_table, compress_response
+from src.registry import (
+    DEFAULT_SEGMENT, ModelRegistry, SegmentNotFoundError, artifact_is_fresh, parse_segment, segment_label
+)
+from src.shared_model import SharedModelReader
+from src.trajectory import build_trajectory_model
+_model_imported = time.perf_counter()
+
+# Persisted model artifact; rebuilt from the CSV when missing or stale
+MODEL_PATH = os.environ.get('MODEL_PATH', 'data/similarity_model.npz')
+DATA_PATH = 'data/premier_league_data_converted.csv'
+
+# Archetypes computed for the style map when a model is trained (0, the default,
+# skips the PCA/k-means fit and disables /map and /clusters)
+STYLE_MAP_ARCHETYPES = int(os.environ.get('STYLE_MAP_ARCHETYPES', '0'))
+
+# Startup breakdown in seconds, printed by initialize_service and exported as metrics
+startup_timings = {
+    "import_flask": _flask_imported - _import_start,
+    "import_model": _model_imported - _flask_imported
+}
 
 # Initialize Flask application
 app = Flask(__name__)
 CORS(app)  # Enable Cross-Origin Resource Sharing for frontend integration
 
-# Global model instance
+# Global model instance (default segment: current Premier League midfielders)
 similarity_model = PlayerSimilarityModel()
 
+# When set, models are attached read-only from shared memory published by
+# publish_shared_model.py instead of being loaded into every worker process
+SHARED_MODEL_DIR = os.environ.get('SHARED_MODEL_DIR')
+SHARED_MODEL_WAIT_SECONDS = float(os.environ.get('SHARED_MODEL_WAIT', '60'))
+shared_model = SharedModelReader(SHARED_MODEL_DIR, segment_label(DEFAULT_SEGMENT)) if SHARED_MODEL_DIR else None
+shared_model_lock = threading.Lock()
+
+# Models for other position groups, seasons and competitions, selected with
+# ?position=, ?season= and ?competition= and built on first use
+model_registry = ModelRegistry(
+    memory_budget_bytes=int(os.environ.get('REGISTRY_MEMORY_MB', '256')) * 1024 ** 2,
+    model_dir=os.environ.get('REGISTRY_MODEL_DIR', 'data/models'),
+    shared_dir=SHARED_MODEL_DIR,
+    archetypes=STYLE_MAP_ARCHETYPES
+)
+
+# Set once the model is loaded and caches are warm; routes answer 503 until then
+service_ready = threading.Event()
+warmup_state = {"status": "starting", "error": None}
+
+# Seconds clients should wait before retrying while the service warms up
+RETRY_AFTER_SECONDS = int(os.environ.get('WARMUP_RETRY_AFTER', '5'))
+
+# Players whose neighbour lists are precomputed during warm-up: any names in
+# WARMUP_PLAYERS plus the WARMUP_TOP_PLAYERS with the most minutes played
+WARMUP_PLAYERS = [name.strip() for name in os.environ.get('WARMUP_PLAYERS', '').split(',') if name.strip()]
+WARMUP_TOP_PLAYERS = int(os.environ.get('WARMUP_TOP_PLAYERS', '50'))
+
+# Values computed during warm-up instead of on every request
+response_cache = {
+    "model_info": None, "players_payload": None, "players_encoded": {}, "map_encoded": {}, "clusters": {}
+}
+
+# Request size limits for the bulk endpoints
+BATCH_MAX_PLAYERS = 500
+NEIGHBOURS_MAX_LIMIT = 10000
+MATRIX_MAX_PLAYERS = 500  # Per side of /similarity/matrix
+
+# Admission cost of the bulk routes: one token per request plus one per this many units of work
+BATCH_PLAYERS_PER_TOKEN = 10
+MATRIX_CELLS_PER_TOKEN = 1000
+NEIGHBOURS_PLAYERS_PER_TOKEN = 100
+
+# Clients allowed to use /admin endpoints when no ADMIN_TOKEN is configured
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+# Health checks, probes and metrics scrapes are never rate limited or shed
+ADMISSION_EXEMPT_ROUTES = ('/', '/livez', '/readyz', '/metrics')
+
+# Serializes the one-off reverse index build triggered by the first /referenced-by request
+reverse_index_lock = threading.Lock()
+
+# Seasons combined by /trajectory (comma-separated, e.g. 2022-23,2023-24,current;
+# default: every season with a data file). Models are built on first use per
+# (position, competition) and kept for the life of the process, together with the
+# serving model their player ids were linked to.
+TRAJECTORY_SEASONS = [season.strip() for season in os.environ.get('TRAJECTORY_SEASONS', '').split(',') if season.strip()]
+trajectory_models = {}  # (position, competition) -> (TrajectoryModel, linked serving model or None)
+trajectory_lock = threading.Lock()
+
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started and begin profiling it if selected."""
+    if metrics.enabled or profiler.enabled:
+        g.request_start = time.perf_counter()
+        g.request_profile = profiler.start_request()
+
+
+@app.before_request
+def admit_request():
+    """Reject the request early if its client is over budget or this worker is saturated."""
+    rule = request.url_rule.rule if request.url_rule else None
+    if not admission.enabled or rule in ADMISSION_EXEMPT_ROUTES or (rule or '').startswith('/admin/'):
+        return None
+    
+    rejection = admission.admit(_client_id(), _request_cost(rule))
+    if rejection is None:
+        g.admitted = True
+        return None
+    
+    if rejection.status == 429:
+        message = "Rate limit exceeded. Please slow down and retry later."
+    else:
+        message = "Server is at capacity. Please retry shortly."
+    response = jsonify({
+        "success": False,
+        "error": message
+    })
+    response.headers['Retry-After'] = str(rejection.retry_after)
+    return response, rejection.status
+
+
+@app.teardown_request
+def release_admission(exc):
+    """Free the request's in-flight slot; runs even when the handler raised."""
+    if g.pop('admitted', False):
+        admission.release()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and record its latency under the matched route."""
+    if metrics.enabled and 'request_start' in g:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = (('route', route), ('method', request.method))
+        metrics.observe('request_duration_seconds', labels, time.perf_counter() - g.request_start)
+        metrics.inc('requests_total', labels + (('status', str(response.status_code)),))
+    return response
+
+
+@app.after_request
+def compress_large_responses(response):
+    """gzip/brotli-compress large responses when the client accepts it."""
+    return compress_response(response, request.accept_encodings)
+
+
+@app.teardown_request
+def finish_request_profile(exc):
+    """Persist the request's profile; runs even when the handler raised."""
+    if g.get('request_profile') is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        profiler.finish_request(g.request_profile, route, time.perf_counter() - g.request_start)
+
+
+def _check_admin_access():
+    """
+    Guard admin endpoints.
+    
+    Returns:
+        Flask response tuple if access is denied, otherwise None
+    """
+    if not profiler.enabled:
+        return jsonify({
+            "success": False,
+            "error": "Request profiling is disabled (set PROFILE_REQUESTS=1)"
+        }), 404
+    
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if admin_token:
+        if request.headers.get('X-Admin-Token') != admin_token:
+            return jsonify({
+                "success": False,
+                "error": "Invalid or missing X-Admin-Token header"
+            }), 403
+    elif request.remote_addr not in LOOPBACK_ADDRESSES:
+        # Profiles expose source paths and timings: without a token, only local callers get them
+        return jsonify({
+            "success": False,
+            "error": "Admin endpoints are only available from localhost unless ADMIN_TOKEN is set"
+        }), 403
+    
+    return None
+
 
 @app.route('/')
 def health_check():
@@ -30,59 +220,135 @@ def health_check():
     Returns:
         JSON response with API status and basic info
     """
-    model_info = similarity_model.get_model_info()
+    model_info = response_cache["model_info"] or {"status": warmup_state["status"]}
     
     return jsonify({
-        "status": "online",
+        "status": "online" if service_ready.is_set() else warmup_state["status"],
         "service": "Premier League Midfielder Similarity Finder",
         "version": "2.0.0",
         "timestamp": datetime.now().isoformat(),
         "model": model_info,
+        "segments": model_registry.stats(),
+        "admission": admission.stats(),
         "endpoints": {
             "health": "/",
             "players": "/players",
             "player_details": "/players/<id>",
+            "referenced_by": "/players/<id>/referenced-by",
             "similarity": "/similar/<name>",
-            "similarity_post": "/similar"
+            "similarity_post": "/similar",
+            "similarity_batch": "/similar/batch",
+            "neighbours": "/neighbours",
+            "compare": "/compare?a=<name>&b=<name>",
+            "similarity_matrix": "/similarity/matrix",
+            "style_map": "/map",
+            "trajectory_similarity": "/trajectory/similar/<name>",
+            "archetype": "/clusters/<id>",
+            "liveness": "/livez",
+            "readiness": "/readyz",
+            "metrics": "/metrics"
         }
     })
 
 
+@app.route('/livez', methods=['GET'])
+def liveness_check():
+    """
+    Liveness probe: the process is up and serving HTTP.
+    
+    Returns:
+        200 while the process is healthy, 500 if warm-up failed (restart needed)
+    """
+    if warmup_state["status"] == "failed":
+        return jsonify({"status": "failed", "error": warmup_state["error"]}), 500
+    
+    return jsonify({"status": "alive"})
+
+
+@app.route('/readyz', methods=['GET'])
+def readiness_check():
+    """
+    Readiness probe: the model is loaded and caches are warm.
+    
+    Returns:
+        200 when ready, otherwise 503 with a Retry-After header
+    """
+    if not service_ready.is_set():
+        return _not_ready_response()
+    
+    return jsonify({"status": "ready"})
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Expose request, stage and startup metrics in Prometheus text format.
+    
+    Returns:
+        Plain-text Prometheus exposition, or 404 if metrics are disabled
+    """
+    if not metrics.enabled:
+        return jsonify({
+            "success": False,
+            "error": "Metrics are disabled (METRICS_ENABLED=0)"
+        }), 404
+    
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/players', methods=['GET'])
 def get_all_players():
     """
     Get list of all available players.
     
+    Query parameters:
+        format (str): json (default), msgpack or arrow (also negotiable via Accept)
+        layout (str): rows (default) or columnar
+        position, season, competition (str): Segment to query (default MF, current, premier_league)
+    
     Returns:
-        JSON response with player list
+        Player list in the requested encoding
     """
     try:
-        if not similarity_model.is_trained:
-            return jsonify({
-                "success": False,
-                "error": "Model not trained. Please initialize the service."
-            }), 500
-        
-        players_data = similarity_model.players_data
-        
-        # Convert to list of dictionaries for JSON response
-        players_list = []
-        for _, player in players_data.iterrows():
-            players_list.append({
-                "player_id": int(player['player_id']),
-                "player_name": player['player_name'],
-                "team": player['team'],
-                "position": player['position'],
-                "age": int(player['age']),
-                "goals": int(player['goals']),
-                "assists": int(player['assists'])
-            })
+        if not service_ready.is_set():
+            return _not_ready_response()
+        
+        fmt, layout = negotiate(request.args.get('format'), request.args.get('layout'), request.accept_mimetypes)
+        
+        model, error = _resolve_model()
+        if error:
+            return error
+        
+        # Only the default segment's encodings are cached
+        is_default = model is similarity_model
+        
+        if fmt == 'json' and layout == 'rows':
+            payload = response_cache["players_payload"] if is_default else None
+            if payload is None:
+                payload = _build_players_payload(model)
+                if is_default:
+                    response_cache["players_payload"] = payload
+            
+            return app.response_class(payload, mimetype=app.json.mimetype)
+        
+        # Other encodings are built on first use and then served from cache
+        encoded = response_cache["players_encoded"].get((fmt, layout)) if is_default else None
+        if encoded is None:
+            with metrics.stage('api.format_rows'):
+                columns = build_player_columns(model.players)
+            with metrics.stage('api.encode'):
+                encoded = render_table("players", fmt, layout, columns=columns)
+            if is_default:
+                response_cache["players_encoded"][(fmt, layout)] = encoded
+        
+        body, mimetype = encoded
+        return app.response_class(body, mimetype=mimetype)
         
+    except UnsupportedFormatError as e:
         return jsonify({
-            "success": True,
-            "count": len(players_list),
-            "players": players_list
-        })
+            "success": False,
+            "error": str(e)
+        }), 406
         
     except Exception as e:
         return jsonify({
@@ -96,6 +362,10 @@ def get_player_details(player_id):
     """
     Get detailed statistics for a specific player.
     
+    Query parameters:
+        similar (int): Also return this many similar players (max 20)
+        position, season, competition (str): Segment to query (default MF, current, premier_league)
+    
     Args:
         player_id (int): Player ID
         
@@ -103,52 +373,39 @@ def get_player_details(player_id):
         JSON response with detailed player stats
     """
     try:
-        if not similarity_model.is_trained:
-            return jsonify({
-                "success": False,
-                "error": "Model not trained. Please initialize the service."
-            }), 500
+        if not service_ready.is_set():
+            return _not_ready_response()
         
-        players_data = similarity_model.players_data
+        model, error = _resolve_model()
+        if error:
+            return error
         
         # Find player by ID
-        player_row = players_data[players_data['player_id'] == player_id]
+        player_index = model.get_index_by_id(player_id)
         
-        if player_row.empty:
+        if player_index is None:
             return jsonify({
                 "success": False,
                 "error": f"Player with ID {player_id} not found"
             }), 404
         
-        player = player_row.iloc[0]
-        
         # Return detailed player information
-        player_details = {
-            "player_id": int(player['player_id']),
-            "player_name": player['player_name'],
-            "team": player['team'],
-            "position": player['position'],
-            "age": int(player['age']),
-            "basic_stats": {
-                "goals": int(player['goals']),
-                "assists": int(player['assists']),
-                "minutes_played": int(player['minutes_played']),
-                "goals_per_90": round(float(player['goals_per_90']), 2),
-                "assists_per_90": round(float(player['assists_per_90']), 2)
-            },
-            "advanced_stats": {
-                "npxG_plus_xAG_per_90": round(float(player['npxG_plus_xAG_per_90']), 2),
-                "progressive_carries_per_90": round(float(player['progressive_carries_per_90']), 2),
-                "progressive_passes_per_90": round(float(player['progressive_passes_per_90']), 2),
-                "progressive_receives_per_90": round(float(player['progressive_receives_per_90']), 2),
-                "total_contributions": int(player['total_contributions'])
-            }
+        response = {
+            "success": True,
+            "player": format_player_details(model.get_player(player_index))
         }
         
-        return jsonify({
-            "success": True,
-            "player": player_details
-        })
+        # Optionally include neighbours so clients need one round trip, not two
+        top_n = request.args.get('similar', default=0, type=int)
+        if top_n > 0:
+            top_n = min(top_n, 20)  # Same limit as /similar
+            similar_players = model.get_similar_players(player_index, top_n)
+            with metrics.stage('api.format_rows'):
+                response["similar_players"] = format_similar_players(model, similar_players)
+            response["algorithm_info"] = ALGORITHM_INFO
+        
+        with metrics.stage('api.jsonify'):
+            return jsonify(response)
         
     except Exception as e:
         return jsonify({
@@ -157,11 +414,92 @@ def get_player_details(player_id):
         }), 500
 
 
+@app.route('/players/<int:player_id>/referenced-by', methods=['GET'])
+def get_referencing_players(player_id):
+    """
+    Find the players that list this player among their most similar.
+    
+    Query parameters:
+        limit (int): Maximum number of referencing players (default 50)
+        position, season, competition (str): Segment to query (default MF, current, premier_league)
+    
+    Args:
+        player_id (int): Player ID
+        
+    Returns:
+        JSON response with referencing players (rank and score in their lists)
+        and a count per team
+    """
+    try:
+        if not service_ready.is_set():
+            return _not_ready_response()
+        
+        model, error = _resolve_model()
+        if error:
+            return error
+        
+        player_index = model.get_index_by_id(player_id)
+        if player_index is None:
+            return jsonify({
+                "success": False,
+                "error": f"Player with ID {player_id} not found"
+            }), 404
+        
+        limit = max(1, request.args.get('limit', default=50, type=int))
+        
+        if model.reverse_index is None:
+            with reverse_index_lock:
+                if model.reverse_index is None:
+                    with metrics.stage('model.build_reverse_index'):
+                        model.build_reverse_index()
+                    # The table and index add to a registry model's resident size
+                    model_registry.update_size(model)
+        
+        with metrics.stage('model.referenced_by'):
+            source_indices, ranks, scores = model.get_referencing_players(player_index)
+        
+        with metrics.stage('api.format_rows'):
+            referenced_by = []
+            teams = {}
+            for source_index, rank, score in zip(source_indices.tolist(), ranks.tolist(), scores.tolist()):
+                entry = format_matrix_player(model.get_player(source_index))
+                teams[entry["team"]] = teams.get(entry["team"], 0) + 1
+                if len(referenced_by) < limit:
+                    entry["rank"] = rank
+                    entry["similarity_score"] = round(score, 3)
+                    referenced_by.append(entry)
+        
+        with metrics.stage('api.jsonify'):
+            return jsonify({
+                "success": True,
+                "player": format_matrix_player(model.get_player(player_index)),
+                "neighbour_depth": model.neighbour_depth(),
+                "count": len(source_indices),
+                "teams": [
+                    {"team": team, "count": count}
+                    for team, count in sorted(teams.items(), key=lambda item: -item[1])
+                ],
+                "referenced_by": referenced_by
+            })
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Error finding referencing players: {str(e)}"
+        }), 500
+
+
 @app.route('/similar/<player_name>', methods=['GET'])
 def find_similar_players(player_name):
     """
     Find players similar to the specified player.
     
+    Query parameters:
+        top_n (int): Number of similar players (1-20, default 5)
+        explain (bool): Add per-feature similarity contributions to each result
+        diversity_lambda (float): 0-1; re-rank for variety (MMR), lower is more diverse
+        position, season, competition (str): Segment to query (default MF, current, premier_league)
+    
     Args:
         player_name (str): Name of the target player
         
@@ -169,63 +507,18 @@ def find_similar_players(player_name):
         JSON response with similar players list
     """
     try:
-        if not similarity_model.is_trained:
-            return jsonify({
-                "success": False,
-                "error": "Model not trained. Please initialize the service."
-            }), 500
+        if not service_ready.is_set():
+            return _not_ready_response()
         
         # Get query parameters
         top_n = request.args.get('top_n', default=5, type=int)
         top_n = max(1, min(top_n, 20))  # Limit between 1 and 20
         
-        # Find the target player
-        player_index, target_player = similarity_model.get_player_by_name(player_name)
-        
-        if player_index is None:
-            return jsonify({
-                "success": False,
-                "error": f"Player '{player_name}' not found. Please check the spelling."
-            }), 404
-        
-        # Get similar players
-        similar_players = similarity_model.get_similar_players(player_index, top_n)
-        
-        # Format results
-        results = []
-        players_data = similarity_model.players_data
-        
-        for similar_index, similarity_score in similar_players:
-            similar_player = players_data.iloc[similar_index]
-            results.append({
-                "player_id": int(similar_player['player_id']),
-                "player_name": similar_player['player_name'],
-                "team": similar_player['team'],
-                "position": similar_player['position'],
-                "similarity_score": round(float(similarity_score), 3),
-                "key_stats": {
-                    "goals": int(similar_player['goals']),
-                    "assists": int(similar_player['assists']),
-                    "progressive_passes_per_90": float(similar_player['progressive_passes_per_90']),
-                    "npxG_plus_xAG_per_90": float(similar_player['npxG_plus_xAG_per_90'])
-                }
-            })
-        
-        # Get target player info
-        return jsonify({
-            "success": True,
-            "target_player": {
-                "name": target_player['player_name'],
-                "team": target_player['team'],
-                "position": target_player['position']
-            },
-            "similar_players": results,
-            "algorithm_info": {
-                "method": "Cosine Similarity",
-                "features_used": 6,  # Real features only: goals/90, assists/90, npxG+xAG/90, 3 progressive stats, total_contributions
-                "normalization": "StandardScaler"
-            }
-        })
+        return _similarity_response(
+            player_name, top_n,
+            explain=_parse_flag(request.args.get('explain')),
+            diversity_lambda=request.args.get('diversity_lambda')
+        )
     
     except Exception as e:
         return jsonify({
@@ -242,18 +535,20 @@ def find_similar_players_post():
     Expected JSON:
     {
         "player_name": "Kevin De Bruyne",
-        "top_n": 5
+        "top_n": 5,
+        "explain": false,
+        "diversity_lambda": 0.7
     }
     
+    Query parameters:
+        position, season, competition (str): Segment to query (default MF, current, premier_league)
+    
     Returns:
         JSON response with similar players list
     """
     try:
-        if not similarity_model.is_trained:
-            return jsonify({
-                "success": False,
-                "error": "Model not trained. Please initialize the service."
-            }), 500
+        if not service_ready.is_set():
+            return _not_ready_response()
         
         # Parse JSON request
         data = request.get_json()
@@ -267,107 +562,1018 @@ def find_similar_players_post():
         player_name = data['player_name']
         top_n = data.get('top_n', 5)
         top_n = max(1, min(top_n, 20))  # Limit between 1 and 20
+        explain = _parse_flag(data.get('explain')) or _parse_flag(request.args.get('explain'))
+        diversity_lambda = data.get('diversity_lambda', request.args.get('diversity_lambda'))
+        
+        return _similarity_response(player_name, top_n, explain=explain, diversity_lambda=diversity_lambda)
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Error finding similar players: {str(e)}"
+        }), 500
+
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_request_profiles():
+    """
+    List captured request profiles, newest first.
+    
+    Returns:
+        JSON response with profile file names and sizes
+    """
+    denied = _check_admin_access()
+    if denied:
+        return denied
+    
+    profiles = profiler.list_profiles()
+    return jsonify({
+        "success": True,
+        "count": len(profiles),
+        "sample_rate": profiler.sample_rate,
+        "slow_ms": profiler.slow_ms,
+        "profiles": profiles
+    })
+
+
+@app.route('/admin/profiles/<path:profile_name>', methods=['GET'])
+def download_request_profile(profile_name):
+    """
+    Download a single captured profile.
+    
+    Args:
+        profile_name (str): File name as listed by /admin/profiles
+        
+    Returns:
+        The raw .prof (pstats) or .folded (flamegraph) file
+    """
+    denied = _check_admin_access()
+    if denied:
+        return denied
+    
+    return send_from_directory(os.path.abspath(profiler.output_dir), profile_name, as_attachment=True)
+
+
+@app.route('/similar/batch', methods=['POST'])
+def find_similar_players_batch():
+    """
+    Find similar players for many players in one vectorized model pass.
+    
+    Expected JSON:
+    {
+        "player_names": ["Kevin De Bruyne", "Bruno Fernandes"],
+        "top_n": 5,
+        "explain": false
+    }
+    
+    Query parameters:
+        format (str): json (default), msgpack or arrow (also negotiable via Accept)
+        layout (str): rows (default) or columnar
+        position, season, competition (str): Segment to query (default MF, current, premier_league)
+    
+    Returns:
+        One row per (query player, neighbour), plus the names that were not found
+    """
+    try:
+        if not service_ready.is_set():
+            return _not_ready_response()
+        
+        fmt, layout = negotiate(request.args.get('format'), request.args.get('layout'), request.accept_mimetypes)
+        
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data.get('player_names'), list):
+            return jsonify({
+                "success": False,
+                "error": "Missing 'player_names' list in request body"
+            }), 400
+        
+        player_names = data['player_names']
+        if not all(isinstance(name, str) for name in player_names):
+            return jsonify({
+                "success": False,
+                "error": "'player_names' must be a list of strings"
+            }), 400
+        if len(player_names) > BATCH_MAX_PLAYERS:
+            return jsonify({
+                "success": False,
+                "error": f"At most {BATCH_MAX_PLAYERS} players per batch"
+            }), 400
+        
+        try:
+            top_n = max(1, min(int(data.get('top_n', 5)), 20))  # Limit between 1 and 20
+        except (TypeError, ValueError):
+            return jsonify({
+                "success": False,
+                "error": "'top_n' must be an integer"
+            }), 400
+        explain = _parse_flag(data.get('explain')) or _parse_flag(request.args.get('explain'))
+        
+        model, error = _resolve_model()
+        if error:
+            return error
+        
+        query_indices = []
+        not_found = []
+        for name in player_names:
+            player_index, _ = model.get_player_by_name(name)
+            if player_index is None:
+                not_found.append(name)
+            else:
+                query_indices.append(player_index)
+        
+        neighbour_indices, neighbour_scores = model.top_k_neighbours(query_indices, top_n)
+        
+        contributions = None
+        if explain:
+            with metrics.stage('model.explain'):
+                contributions = model.feature_contributions(query_indices, neighbour_indices)
+        
+        with metrics.stage('api.format_rows'):
+            columns = build_similarity_table(
+                model, np.asarray(query_indices, dtype=np.intp), neighbour_indices, neighbour_scores, contributions
+            )
+        
+        with metrics.stage('api.encode'):
+            body, mimetype = render_table(
+                "results", fmt, layout, columns=columns,
+                meta={"top_n": top_n, "not_found": not_found, "algorithm_info": ALGORITHM_INFO}
+            )
+        return app.response_class(body, mimetype=mimetype)
+    
+    except UnsupportedFormatError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 406
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Error finding similar players: {str(e)}"
+        }), 500
+
+
+@app.route('/compare', methods=['GET'])
+def compare_players():
+    """
+    Compare two players directly.
+    
+    Query parameters:
+        a (str): First player's name (or player_id)
+        b (str): Second player's name (or player_id)
+        position, season, competition (str): Segment to query (default MF, current, premier_league)
+    
+    Returns:
+        JSON response with the exact similarity and per-feature values, deltas and contributions
+    """
+    try:
+        if not service_ready.is_set():
+            return _not_ready_response()
+        
+        player_a = request.args.get('a')
+        player_b = request.args.get('b')
+        if not player_a or not player_b:
+            return jsonify({
+                "success": False,
+                "error": "Both 'a' and 'b' query parameters are required"
+            }), 400
         
-        # Find the target player
-        player_index, target_player = similarity_model.get_player_by_name(player_name)
+        model, error = _resolve_model()
+        if error:
+            return error
+        
+        index_a = _find_player_index(model, player_a)
+        index_b = _find_player_index(model, player_b)
+        missing = [name for name, index in ((player_a, index_a), (player_b, index_b)) if index is None]
+        if missing:
+            return jsonify({
+                "success": False,
+                "error": f"Player(s) not found: {', '.join(missing)}"
+            }), 404
+        
+        with metrics.stage('model.compare'):
+            comparison = model.compare_players(index_a, index_b)
+        
+        response = {"success": True}
+        response.update(format_comparison(model, index_a, index_b, comparison))
+        response["algorithm_info"] = ALGORITHM_INFO
+        
+        with metrics.stage('api.jsonify'):
+            return jsonify(response)
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Error comparing players: {str(e)}"
+        }), 500
+
+
+@app.route('/similarity/matrix', methods=['POST'])
+def similarity_matrix():
+    """
+    Similarity of every player in one list to every player in another.
+    
+    Expected JSON (names or player_ids):
+    {
+        "players_a": ["Kevin De Bruyne", "Bruno Fernandes"],
+        "players_b": ["Martin Ødegaard", 42]
+    }
+    
+    Query parameters:
+        position, season, competition (str): Segment to query (default MF, current, premier_league)
+    
+    Returns:
+        JSON response with the resolved players of each side and the
+        len(players_a) x len(players_b) similarity matrix
+    """
+    try:
+        if not service_ready.is_set():
+            return _not_ready_response()
+        
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data.get('players_a'), list) or not isinstance(data.get('players_b'), list):
+            return jsonify({
+                "success": False,
+                "error": "Missing 'players_a' and 'players_b' lists in request body"
+            }), 400
+        
+        if max(len(data['players_a']), len(data['players_b'])) > MATRIX_MAX_PLAYERS:
+            return jsonify({
+                "success": False,
+                "error": f"At most {MATRIX_MAX_PLAYERS} players per side"
+            }), 400
         
+        model, error = _resolve_model()
+        if error:
+            return error
+        
+        not_found = []
+        sides = []
+        for references in (data['players_a'], data['players_b']):
+            indices = []
+            for reference in references:
+                player_index = _find_player_index(model, reference)
+                if player_index is None:
+                    not_found.append(reference)
+                else:
+                    indices.append(player_index)
+            sides.append(indices)
+        indices_a, indices_b = sides
+        
+        with metrics.stage('model.similarity_matrix'):
+            matrix = model.similarity_matrix(indices_a, indices_b)
+        
+        with metrics.stage('api.format_rows'):
+            response = {
+                "success": True,
+                "players_a": [format_matrix_player(model.get_player(i)) for i in indices_a],
+                "players_b": [format_matrix_player(model.get_player(i)) for i in indices_b],
+                "matrix": np.round(matrix, 3).tolist(),
+                "not_found": not_found,
+                "algorithm_info": ALGORITHM_INFO
+            }
+        
+        with metrics.stage('api.jsonify'):
+            return jsonify(response)
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Error computing similarity matrix: {str(e)}"
+        }), 500
+
+
+@app.route('/trajectory/similar/<player_name>', methods=['GET'])
+def find_similar_trajectories(player_name):
+    """
+    Find players whose profile evolved like this player's over recent seasons.
+    
+    Query parameters:
+        window (int): Consecutive seasons compared, ending with the player's latest (default 3)
+        top_n (int): Number of similar players (1-20, default 5)
+        align (str): recent (default) compares the same seasons; any scores every
+            window of each player's career and keeps the best
+        position, competition (str): Segment to query (default MF, premier_league);
+            seasons come from TRAJECTORY_SEASONS
+    
+    Args:
+        player_name (str): Name of the target player
+        
+    Returns:
+        JSON response with similar players, their matched seasons and per-season scores
+    """
+    try:
+        if not service_ready.is_set():
+            return _not_ready_response()
+        
+        top_n = max(1, min(request.args.get('top_n', default=5, type=int), 20))
+        window = request.args.get('window', default=3, type=int)
+        align = request.args.get('align', default='recent').lower()
+        
+        try:
+            segment = parse_segment(request.args.get('position'), None, request.args.get('competition'))
+            model = _get_trajectory_model(segment)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        except SegmentNotFoundError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 404
+        
+        player_index = model.find_index_by_name(player_name)
         if player_index is None:
             return jsonify({
                 "success": False,
-                "error": f"Player '{player_name}' not found. Please check the spelling."
+                "error": f"Player '{player_name}' not found in {', '.join(model.seasons)}. Please check the spelling."
             }), 404
         
-        # Get similar players
-        similar_players = similarity_model.get_similar_players(player_index, top_n)
-        
-        # Format results
-        results = []
-        players_data = similarity_model.players_data
-        
-        for similar_index, similarity_score in similar_players:
-            similar_player = players_data.iloc[similar_index]
-            results.append({
-                "player_id": int(similar_player['player_id']),
-                "player_name": similar_player['player_name'],
-                "team": similar_player['team'],
-                "position": similar_player['position'],
-                "similarity_score": round(float(similarity_score), 3),
-                "key_stats": {
-                    "goals": int(similar_player['goals']),
-                    "assists": int(similar_player['assists']),
-                    "progressive_passes_per_90": float(similar_player['progressive_passes_per_90']),
-                    "npxG_plus_xAG_per_90": float(similar_player['npxG_plus_xAG_per_90'])
+        try:
+            query_start, matches = model.get_similar_trajectories(player_index, window, top_n, align)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        
+        target_player = format_target_player(model.players.record(player_index))
+        target_player["seasons"] = model.seasons[query_start:query_start + window]
+        
+        with metrics.stage('api.format_rows'):
+            results = format_trajectory_matches(model, window, matches)
+        
+        with metrics.stage('api.jsonify'):
+            return jsonify({
+                "success": True,
+                "target_player": target_player,
+                "similar_players": results,
+                "trajectory_info": {
+                    "method": "Mean per-season cosine similarity over aligned season windows",
+                    "normalization": "StandardScaler fitted on every player-season",
+                    "window": window,
+                    "align": align,
+                    "seasons_loaded": model.seasons
                 }
             })
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Error finding similar trajectories: {str(e)}"
+        }), 500
+
+
+@app.route('/map', methods=['GET'])
+def get_style_map():
+    """
+    2D style map of every player, coloured by archetype.
+    
+    Positions are the players' projections onto the two principal components
+    of the standardized features, computed at train time.
+    
+    Query parameters:
+        format (str): json (default), msgpack or arrow (also negotiable via Accept)
+        layout (str): rows (default) or columnar
+        position, season, competition (str): Segment to query (default MF, current, premier_league)
+    
+    Returns:
+        One row per player (id, name, team, position, x, y, archetype) plus
+        the explained variance of each axis and a summary of each archetype
+    """
+    try:
+        if not service_ready.is_set():
+            return _not_ready_response()
+        
+        fmt, layout = negotiate(request.args.get('format'), request.args.get('layout'), request.accept_mimetypes)
         
+        model, error = _resolve_model()
+        if error:
+            return error
+        if model.style_map is None:
+            return _no_style_map_response()
+        
+        # Only the default segment's encodings are cached
+        is_default = model is similarity_model
+        encoded = response_cache["map_encoded"].get((fmt, layout)) if is_default else None
+        if encoded is None:
+            encoded = _encode_map(model, fmt, layout)
+            if is_default:
+                response_cache["map_encoded"][(fmt, layout)] = encoded
+        
+        body, mimetype = encoded
+        return app.response_class(body, mimetype=mimetype)
+    
+    except UnsupportedFormatError as e:
         return jsonify({
-            "success": True,
-            "target_player": {
-                "name": target_player['player_name'],
-                "team": target_player['team'],
-                "position": target_player['position']
-            },
-            "similar_players": results,
-            "algorithm_info": {
-                "method": "Cosine Similarity",
-                "features_used": 6,
-                "normalization": "StandardScaler"
-            }
-        })
+            "success": False,
+            "error": str(e)
+        }), 406
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Error retrieving style map: {str(e)}"
+        }), 500
+
+
+@app.route('/clusters/<int:archetype_id>', methods=['GET'])
+def get_archetype(archetype_id):
+    """
+    One archetype and its members, most typical first.
+    
+    Query parameters:
+        position, season, competition (str): Segment to query (default MF, current, premier_league)
+    
+    Args:
+        archetype_id (int): Archetype number (0 is the largest)
+        
+    Returns:
+        JSON response with the archetype's centroid profile and its players
+        ordered by distance to the centroid
+    """
+    try:
+        if not service_ready.is_set():
+            return _not_ready_response()
+        
+        model, error = _resolve_model()
+        if error:
+            return error
+        if model.style_map is None:
+            return _no_style_map_response()
+        
+        if archetype_id >= model.style_map.num_archetypes:
+            return jsonify({
+                "success": False,
+                "error": f"Archetype {archetype_id} not found. Use 0-{model.style_map.num_archetypes - 1}"
+            }), 404
+        
+        payload = response_cache["clusters"].get(archetype_id) if model is similarity_model else None
+        if payload is None:
+            payload = _build_cluster_payload(model, archetype_id)
+        
+        return app.response_class(payload, mimetype=app.json.mimetype)
     
     except Exception as e:
         return jsonify({
             "success": False,
-            "error": f"Error finding similar players: {str(e)}"
+            "error": f"Error retrieving archetype: {str(e)}"
         }), 500
 
 
+@app.route('/neighbours', methods=['GET'])
+def export_neighbours():
+    """
+    Export top-N neighbour lists for a page of players (ids only).
+    
+    Query parameters:
+        top_n (int): Neighbours per player (1-20, default 5)
+        offset (int): First player row to export (default 0)
+        limit (int): Number of players to export (default 1000, max 10000)
+        format (str): json (default), msgpack or arrow (also negotiable via Accept)
+        layout (str): rows (default) or columnar
+        position, season, competition (str): Segment to query (default MF, current, premier_league)
+    
+    Returns:
+        One row per (player, neighbour) with rank and similarity score
+    """
+    try:
+        if not service_ready.is_set():
+            return _not_ready_response()
+        
+        fmt, layout = negotiate(request.args.get('format'), request.args.get('layout'), request.accept_mimetypes)
+        
+        top_n = max(1, min(request.args.get('top_n', default=5, type=int), 20))
+        offset = max(0, request.args.get('offset', default=0, type=int))
+        limit = max(1, min(request.args.get('limit', default=1000, type=int), NEIGHBOURS_MAX_LIMIT))
+        
+        model, error = _resolve_model()
+        if error:
+            return error
+        
+        num_players = len(model.players)
+        player_indices = np.arange(offset, min(offset + limit, num_players))
+        neighbour_indices, neighbour_scores = model.top_k_neighbours(player_indices, top_n)
+        
+        with metrics.stage('api.format_rows'):
+            columns = build_neighbour_table(model, player_indices, neighbour_indices, neighbour_scores)
+        
+        next_offset = offset + len(player_indices)
+        with metrics.stage('api.encode'):
+            body, mimetype = render_table(
+                "neighbours", fmt, layout, columns=columns,
+                meta={
+                    "top_n": top_n,
+                    "offset": offset,
+                    "total_players": num_players,
+                    "next_offset": next_offset if next_offset < num_players else None
+                }
+            )
+        return app.response_class(body, mimetype=mimetype)
+    
+    except UnsupportedFormatError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 406
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Error exporting neighbours: {str(e)}"
+        }), 500
+
+
+def _not_ready_response():
+    """
+    Response for requests that arrive before warm-up has finished.
+    
+    Returns:
+        Flask response tuple with status 503 and a Retry-After header
+    """
+    response = jsonify({
+        "success": False,
+        "status": warmup_state["status"],
+        "error": warmup_state["error"] or "Service is warming up. Please retry shortly."
+    })
+    response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+    return response, 503
+
+
+def _resolve_model():
+    """
+    Pick the model for the request's ?position=, ?season= and ?competition=.
+    
+    Requests without these parameters use the global default model; other
+    segments come from the registry, which builds them on first use.
+    
+    Returns:
+        tuple: (model, None) or (None, Flask error response tuple)
+    """
+    try:
+        segment = parse_segment(
+            request.args.get('position'), request.args.get('season'), request.args.get('competition')
+        )
+        return _segment_model(segment), None
+    
+    except ValueError as e:
+        return None, (jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400)
+    except SegmentNotFoundError as e:
+        return None, (jsonify({
+            "success": False,
+            "error": str(e)
+        }), 404)
+
+
+def _segment_model(segment):
+    """
+    Get the serving model for a segment: the global default model or a registry model.
+    
+    Raises:
+        SegmentNotFoundError: No data for the segment
+    """
+    if segment == DEFAULT_SEGMENT:
+        if shared_model is not None:
+            _refresh_shared_model()
+        return similarity_model
+    return model_registry.get(segment)
+
+
+def _refresh_shared_model():
+    """
+    Switch to a newly published shared model, if the supervisor reloaded it.
+    
+    The swap is a single global assignment; requests that already resolved
+    the previous model finish on it. Cached responses are rebuilt once.
+    """
+    global similarity_model
+    
+    model = shared_model.get()
+    if model is None or model is similarity_model:
+        return
+    
+    with shared_model_lock:
+        # Re-read under the lock so a thread holding an older generation cannot swap it back in
+        model = shared_model.get()
+        if model is not similarity_model:
+            print(f"🔄 Switching to shared model generation {shared_model.generation}")
+            warm_caches(model)
+            similarity_model = model
+
+
+def _build_players_payload(model):
+    """
+    Serialize the /players response once so requests can reuse the bytes.
+    
+    Args:
+        model (PlayerSimilarityModel): Model whose players are listed
+    
+    Returns:
+        str: JSON document for the /players endpoint
+    """
+    with metrics.stage('api.format_rows'):
+        players_list = build_player_list(model.players)
+    
+    with metrics.stage('api.jsonify'):
+        return app.json.dumps({
+            "success": True,
+            "count": len(players_list),
+            "players": players_list
+        }, separators=(",", ":")) + "\n"
+
+
+def _get_trajectory_model(segment):
+    """
+    Get the trajectory model for a segment's position and competition, building it on first use.
+    
+    Player ids are linked to the current-season serving model, as served by
+    /players/<id>, and relinked whenever that model is replaced (a shared
+    model generation swap, a registry rebuild).
+    
+    Raises:
+        SegmentNotFoundError: No season data for the competition
+    """
+    key = (segment.position, segment.competition)
+    try:
+        source = _segment_model(segment._replace(season=DEFAULT_SEGMENT.season))
+    except SegmentNotFoundError:
+        source = None
+    
+    entry = trajectory_models.get(key)
+    if entry is None or (source is not None and entry[1] is not source):
+        with trajectory_lock:
+            entry = trajectory_models.get(key)
+            if entry is None:
+                model = build_trajectory_model(segment.position, segment.competition, TRAJECTORY_SEASONS or None)
+                linked = None
+            else:
+                model, linked = entry
+            if source is not None and linked is not source:
+                model.link_player_ids(source.players)
+                linked = source
+            entry = (model, linked)
+            trajectory_models[key] = entry
+    return entry[0]
+
+
+def _encode_map(model, fmt, layout):
+    """
+    Encode the /map response for a model with a style map.
+    
+    Returns:
+        tuple: (body bytes, mimetype)
+    """
+    style_map = model.style_map
+    
+    with metrics.stage('api.format_rows'):
+        columns = build_map_columns(model)
+        archetypes = [format_archetype(model, archetype_id) for archetype_id in range(style_map.num_archetypes)]
+    
+    with metrics.stage('api.encode'):
+        return render_table(
+            "players", fmt, layout, columns=columns,
+            meta={
+                "explained_variance": np.round(style_map.explained_variance, 4).tolist(),
+                "archetypes": archetypes
+            }
+        )
+
+
+def _build_cluster_payload(model, archetype_id):
+    """
+    Serialize a /clusters/<id> response once so requests can reuse it.
+    
+    Returns:
+        str: JSON document
+    """
+    style_map = model.style_map
+    
+    with metrics.stage('api.format_rows'):
+        members = []
+        for player_index in style_map.members(archetype_id).tolist():
+            entry = format_matrix_player(model.get_player(player_index))
+            x, y = style_map.coordinates[player_index].tolist()
+            entry["x"] = round(x, 4)
+            entry["y"] = round(y, 4)
+            entry["distance_to_centroid"] = round(float(style_map.distances[player_index]), 4)
+            members.append(entry)
+    
+    with metrics.stage('api.jsonify'):
+        return app.json.dumps({
+            "success": True,
+            "archetype": format_archetype(model, archetype_id),
+            "count": len(members),
+            "players": members
+        }, separators=(",", ":")) + "\n"
+
+
+def _no_style_map_response():
+    """404 for /map and /clusters on a model trained without a style map."""
+    return jsonify({
+        "success": False,
+        "error": "This model has no style map. Set STYLE_MAP_ARCHETYPES > 0 and restart the API "
+                 "(models saved without a map are then retrained)."
+    }), 404
+
+
+def _client_id():
+    """Identify the caller for rate limiting (the client header is only trusted from known proxies)."""
+    return admission.client_key(request.remote_addr, request.headers)
+
+
+def _request_cost(rule):
+    """
+    Admission tokens a request spends, proportional to the work it asks for.
+    
+    Batch cost grows with the number of players, matrix cost with the number
+    of cells and neighbour exports with the page size; everything else is 1.
+    
+    Args:
+        rule (str): Matched URL rule (None for unknown routes)
+    
+    Returns:
+        float: Token cost
+    """
+    data = request.get_json(silent=True) if rule in ('/similar/batch', '/similarity/matrix') else None
+    
+    if rule == '/similar/batch' and isinstance(data, dict) and isinstance(data.get('player_names'), list):
+        return 1 + len(data['player_names']) / BATCH_PLAYERS_PER_TOKEN
+    
+    if rule == '/similarity/matrix' and isinstance(data, dict) \
+            and isinstance(data.get('players_a'), list) and isinstance(data.get('players_b'), list):
+        return 1 + len(data['players_a']) * len(data['players_b']) / MATRIX_CELLS_PER_TOKEN
+    
+    if rule == '/neighbours':
+        limit = max(1, min(request.args.get('limit', default=1000, type=int), NEIGHBOURS_MAX_LIMIT))
+        return 1 + limit / NEIGHBOURS_PLAYERS_PER_TOKEN
+    
+    return 1
+
+
+def _find_player_index(model, reference):
+    """
+    Resolve a player given by player_id (int or digit string) or by name.
+    
+    Returns:
+        int or None: Row index, or None if no player matches
+    """
+    if isinstance(reference, bool):
+        return None
+    if isinstance(reference, int):
+        return model.get_index_by_id(reference)
+    
+    reference = str(reference).strip()
+    if reference.isdigit():
+        return model.get_index_by_id(int(reference))
+    
+    player_index, _ = model.get_player_by_name(reference)
+    return player_index
+
+
+def _parse_flag(value):
+    """Interpret a query-string or JSON flag such as explain=true."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def _similarity_response(player_name, top_n, explain=False, diversity_lambda=None):
+    """
+    Shared implementation of the GET and POST similarity routes.
+    
+    Args:
+        player_name (str): Name (or partial name) of the target player
+        top_n (int): Number of similar players to return (already clamped)
+        explain (bool): Include per-feature contributions for each neighbour
+        diversity_lambda: Raw MMR lambda from the request (None for the plain ranking)
+        
+    Returns:
+        Flask response tuple or response object
+    """
+    if diversity_lambda is not None:
+        try:
+            diversity_lambda = float(diversity_lambda)
+        except (TypeError, ValueError):
+            diversity_lambda = -1.0
+        if not 0.0 <= diversity_lambda <= 1.0:
+            return jsonify({
+                "success": False,
+                "error": "'diversity_lambda' must be a number between 0 and 1"
+            }), 400
+    
+    model, error = _resolve_model()
+    if error:
+        return error
+    
+    # Find the target player
+    player_index, target_player = model.get_player_by_name(player_name)
+    
+    if player_index is None:
+        return jsonify({
+            "success": False,
+            "error": f"Player '{player_name}' not found. Please check the spelling."
+        }), 404
+    
+    # Get similar players
+    contributions = None
+    if explain:
+        similar_players, contributions = model.get_similar_players(
+            player_index, top_n, explain=True, diversity_lambda=diversity_lambda
+        )
+    else:
+        similar_players = model.get_similar_players(player_index, top_n, diversity_lambda=diversity_lambda)
+    
+    # Format results
+    with metrics.stage('api.format_rows'):
+        results = format_similar_players(model, similar_players, contributions)
+    
+    response = {
+        "success": True,
+        "target_player": format_target_player(target_player),
+        "similar_players": results,
+        "algorithm_info": ALGORITHM_INFO
+    }
+    if explain:
+        response["explanation"] = EXPLANATION_INFO
+    if diversity_lambda is not None:
+        response["reranking"] = {"method": "Maximal Marginal Relevance", "lambda": diversity_lambda}
+    
+    with metrics.stage('api.jsonify'):
+        return jsonify(response)
+
+
+def _record_startup(stage, seconds):
+    """Store a startup step duration for the breakdown report and /metrics."""
+    startup_timings[stage] = seconds
+    metrics.record_startup(stage, seconds)
+
+
 def initialize_service():
     """
-    Initialize the similarity service by loading data and training the model.
-    This runs once when the server starts.
+    Initialize the similarity service.
+    
+    Attaches the shared-memory model when SHARED_MODEL_DIR is set. Otherwise
+    loads the persisted model from MODEL_PATH when it is up to date (no pandas
+    or scikit-learn import needed), or loads the CSV, trains the model and
+    saves it for the next start.
     """
+    global similarity_model
+    
     try:
         print("🚀 Initializing Premier League Midfielder Similarity Finder...")
-        print("📊 Loading player data...")
+        for stage, seconds in list(startup_timings.items()):
+            metrics.record_startup(stage, seconds)
         
-        # Load data
-        players_data = load_real_data()
+        if shared_model is not None:
+            print(f"🔗 Attaching shared model from {SHARED_MODEL_DIR}...")
+            start = time.perf_counter()
+            model = shared_model.wait(SHARED_MODEL_WAIT_SECONDS)
+            if model is None:
+                raise RuntimeError(f"No shared model published in {SHARED_MODEL_DIR} after {SHARED_MODEL_WAIT_SECONDS:.0f}s")
+            similarity_model = model
+            _record_startup('attach_shared_model', time.perf_counter() - start)
+        elif artifact_is_fresh(MODEL_PATH, DATA_PATH, STYLE_MAP_ARCHETYPES):
+            print(f"📦 Loading persisted model from {MODEL_PATH}...")
+            start = time.perf_counter()
+            similarity_model.load(MODEL_PATH)
+            _record_startup('load_model', time.perf_counter() - start)
+        else:
+            print("📊 Loading player data...")
+            
+            # Deferred import: pandas is only loaded when ingestion is needed
+            from src.data_loader import load_real_data
+            
+            # Load data (includes the pandas import)
+            start = time.perf_counter()
+            players_data = load_real_data()
+            _record_startup('load_real_data', time.perf_counter() - start)
+            
+            print("🔧 Training similarity model...")
+            
+            # Train model
+            start = time.perf_counter()
+            similarity_model.train(players_data, archetypes=STYLE_MAP_ARCHETYPES)
+            _record_startup('train', time.perf_counter() - start)
+            
+            try:
+                similarity_model.save(MODEL_PATH)
+                print(f"💾 Saved model to {MODEL_PATH}")
+            except OSError as e:
+                print(f"⚠️ Could not save model to {MODEL_PATH}: {str(e)}")
         
-        print("🔧 Training similarity model...")
+        start = time.perf_counter()
+        warm_caches()
+        _record_startup('warm_caches', time.perf_counter() - start)
         
-        # Train model
-        similarity_model.train(players_data)
+        print("⏱️ Startup breakdown:")
+        for stage, seconds in startup_timings.items():
+            print(f"   {stage:<20} {seconds * 1000:8.1f} ms")
         
+        warmup_state["status"] = "ready"
+        service_ready.set()
         print("✅ Service initialized successfully!")
         return True
         
     except Exception as e:
+        warmup_state["status"] = "failed"
+        warmup_state["error"] = f"Failed to initialize service: {str(e)}"
         print(f"❌ Failed to initialize service: {str(e)}")
         return False
 
 
+def warm_caches(model=None):
+    """
+    Pre-populate per-request caches for a model.
+    
+    - model info for the health check
+    - the serialized /players payload
+    - the /map payload and every /clusters/<id> response, if the model has a style map
+    - neighbour lists for the most likely queried players
+    
+    Each cache entry is built in full before it replaces the old one, so
+    concurrent requests never see a half-filled entry.
+    
+    Args:
+        model (PlayerSimilarityModel): Model about to be served (default: the current one)
+    """
+    model = model or similarity_model
+    
+    map_encoded = {}
+    clusters = {}
+    if model.style_map is not None:
+        map_encoded[('json', 'rows')] = _encode_map(model, 'json', 'rows')
+        for archetype_id in range(model.style_map.num_archetypes):
+            clusters[archetype_id] = _build_cluster_payload(model, archetype_id)
+    
+    response_cache.update({
+        "model_info": model.get_model_info(),
+        "players_payload": _build_players_payload(model),
+        "players_encoded": {},
+        "map_encoded": map_encoded,
+        "clusters": clusters
+    })
+    
+    warm_indices = []
+    for name in WARMUP_PLAYERS:
+        player_index, _ = model.get_player_by_name(name)
+        if player_index is not None:
+            warm_indices.append(player_index)
+    
+    if WARMUP_TOP_PLAYERS > 0:
+        minutes = model.players.numeric['minutes_played']
+        warm_indices.extend(minutes.argsort()[::-1][:WARMUP_TOP_PLAYERS].tolist())
+    
+    model.precompute_neighbours(sorted(set(warm_indices)), MAX_CACHED_NEIGHBOURS)
+
+
+def start_background_warmup():
+    """
+    Run initialize_service() in a background thread so the server can start
+    listening (and answer /livez) immediately.
+    
+    Returns:
+        threading.Thread: The warm-up thread
+    """
+    warmup_state["status"] = "warming_up"
+    thread = threading.Thread(target=initialize_service, name="service-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
 if __name__ == '__main__':
-    # Initialize the service
-    if initialize_service():
-        print("\n" + "="*50)
-        print("🌟 Premier League Midfielder Similarity Finder")
-        print("="*50)
-        print("📍 Server: http://localhost:5000")
-        print("📋 Available endpoints:")
-        print("   GET  /                     - API info")
-        print("   GET  /players              - List all players")
-        print("   GET  /players/<id>         - Player details")
-        print("   GET  /similar/<name>       - Find similar players")
-        print("   POST /similar              - Find similar (JSON)")
-        print("="*50)
-        
-        # Run the Flask development server
-        app.run(
-            debug=True,
-            host='0.0.0.0',
-            port=5000
-        )
-    else:
-        print("❌ Failed to start service due to initialization errors")
-        exit(1)
+    # Load/train the model in the background so probes get answers right away;
+    # data routes return 503 until /readyz reports ready
+    start_background_warmup()
+    
+    print("\n" + "="*50)
+    print("🌟 Premier League Midfielder Similarity Finder")
+    print("="*50)
+    print("📍 Server: http://localhost:5000")
+    print("📋 Available endpoints:")
+    print("   GET  /                     - API info")
+    print("   GET  /livez                - Liveness probe")
+    print("   GET  /readyz               - Readiness probe")
+    print("   GET  /players              - List all players")
+    print("   GET  /players/<id>         - Player details")
+    print("   GET  /players/<id>/referenced-by - Who lists this player as similar")
+    print("   GET  /similar/<name>       - Find similar players")
+    print("   POST /similar              - Find similar (JSON)")
+    print("   POST /similar/batch        - Find similar for many players")
+    print("   GET  /neighbours           - Bulk neighbour export")
+    print("   GET  /compare?a=&b=        - Compare two players")
+    print("   POST /similarity/matrix    - Many-to-many similarity")
+    print("   GET  /map                  - 2D style map with archetypes")
+    print("   GET  /clusters/<id>        - Archetype profile and members")
+    print("   GET  /trajectory/similar/<name> - Similar multi-season trajectories")
+    print("   GET  /metrics              - Prometheus metrics")
+    print("="*50)
+    
+    # Run the Flask development server (the reloader would warm up a second copy)
+    app.run(
+        debug=True,
+        host='0.0.0.0',
+        port=5000,
+        use_reloader=False
+    )
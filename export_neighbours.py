@@ -0,0 +1,242 @@
+"""
+Offline bulk export of every player's most similar players.
+
+Loads the persisted model (or, when it is missing or older than the CSV,
+loads the CSV via load_real_data and trains),
+computes the top-K neighbours for all players in parallel chunks and streams
+them to Parquet, CSV or NDJSON without ever holding the full similarity
+matrix or the full result in memory.
+
+Usage:
+    python export_neighbours.py --output neighbours.parquet --top-n 10
+    python export_neighbours.py --output neighbours.csv --with-names --workers 4
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.data_loader import get_data_path
+from src.model import PlayerSimilarityModel
+from src.registry import artifact_is_fresh
+from src.responses import build_neighbour_table
+
+FORMATS = ('parquet', 'csv', 'ndjson')
+
+
+class CsvWriter:
+    """Streams neighbour chunks to a CSV file."""
+    
+    def __init__(self, path, fields):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(fields)
+    
+    def write(self, columns):
+        self.writer.writerows(zip(*(_as_list(values) for values in columns.values())))
+    
+    def close(self):
+        self.file.close()
+
+
+class NdjsonWriter:
+    """Streams neighbour chunks as one JSON object per line."""
+    
+    def __init__(self, path, fields):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.fields = fields
+    
+    def write(self, columns):
+        for row in zip(*(_as_list(values) for values in columns.values())):
+            self.file.write(json.dumps(dict(zip(self.fields, row))) + "\n")
+    
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Streams neighbour chunks into row groups of one Parquet file (needs pyarrow)."""
+    
+    def __init__(self, path, fields):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.writer = None
+    
+    def write(self, columns):
+        table = self.pa.table({name: self.pa.array(values) for name, values in columns.items()})
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema, compression='zstd')
+        self.writer.write_table(table)
+    
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+WRITERS = {'csv': CsvWriter, 'ndjson': NdjsonWriter, 'parquet': ParquetWriter}
+
+
+def _as_list(values):
+    return values.tolist() if hasattr(values, 'tolist') else values
+
+
+def load_model(model_path, retrain):
+    """
+    Load the persisted model, or load the data and train a fresh one.
+    
+    An artifact older than the CSV (e.g. after a data refresh the API has
+    not picked up yet) is ignored, so the export never ships stale
+    neighbours. The retrained model is not saved; the API rebuilds its own.
+    
+    Args:
+        model_path (str): Path of the .npz artifact written by the API
+        retrain (bool): Ignore any artifact and train from the CSV
+    
+    Returns:
+        PlayerSimilarityModel: Trained model
+    """
+    model = PlayerSimilarityModel()
+    data_path = get_data_path()
+    if not retrain and artifact_is_fresh(model_path, data_path):
+        print(f"📦 Loading persisted model from {model_path}...")
+        model.load(model_path)
+    else:
+        if not retrain and os.path.exists(model_path):
+            print(f"⚠️  {model_path} is older than {data_path}; retraining from the CSV")
+        from src.data_loader import load_real_data
+        print("📊 Loading player data...")
+        players_data = load_real_data()
+        print("🔧 Training similarity model...")
+        model.train(players_data)
+    return model
+
+
+def pick_chunk_size(num_players, workers, memory_mb):
+    """
+    Largest chunk whose score blocks fit the memory budget.
+    
+    Each in-flight chunk holds a (chunk x num_players) float64 score block
+    plus an equally sized index array from the partial sort.
+    """
+    bytes_per_row = num_players * 16
+    return max(1, int(memory_mb * 1024 ** 2 // (bytes_per_row * workers)))
+
+
+def compute_chunk(model, start, stop, top_n, with_names):
+    """Top-N neighbours for players [start, stop) as export columns."""
+    player_indices = np.arange(start, stop)
+    neighbour_indices, neighbour_scores = model.top_k_neighbours(player_indices, top_n)
+    columns = build_neighbour_table(model, player_indices, neighbour_indices, neighbour_scores)
+    
+    if with_names:
+        names = model.players.names
+        k = neighbour_indices.shape[1]
+        columns = {
+            "player_id": columns["player_id"],
+            "player_name": [names[i] for i in player_indices.tolist() for _ in range(k)],
+            "rank": columns["rank"],
+            "neighbour_id": columns["neighbour_id"],
+            "neighbour_name": [names[i] for i in neighbour_indices.ravel().tolist()],
+            "similarity_score": columns["similarity_score"]
+        }
+    return columns
+
+
+def export_neighbours(model, output, fmt, top_n, workers, memory_mb, with_names):
+    """
+    Compute and write neighbours for every player.
+    
+    Chunks are computed on a thread pool (the matrix products release the GIL)
+    and written in order; at most 2 x workers chunks are in flight, which
+    bounds memory regardless of catalog size.
+    
+    Returns:
+        int: Number of rows written
+    """
+    num_players = len(model.players)
+    chunk_size = pick_chunk_size(num_players, workers, memory_mb)
+    chunk_starts = range(0, num_players, chunk_size)
+    
+    fields = ['player_id', 'rank', 'neighbour_id', 'similarity_score']
+    if with_names:
+        fields = ['player_id', 'player_name', 'rank', 'neighbour_id', 'neighbour_name', 'similarity_score']
+    
+    print(f"🧮 {num_players} players, top {top_n}, {len(chunk_starts)} chunks of {chunk_size}, {workers} workers")
+    
+    writer = WRITERS[fmt](output, fields)
+    rows_written = 0
+    start_time = time.perf_counter()
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            starts = iter(chunk_starts)
+            
+            def submit_next():
+                start = next(starts, None)
+                if start is not None:
+                    stop = min(start + chunk_size, num_players)
+                    pending.append(executor.submit(compute_chunk, model, start, stop, top_n, with_names))
+            
+            for _ in range(2 * workers):
+                submit_next()
+            
+            while pending:
+                columns = pending.popleft().result()
+                submit_next()
+                writer.write(columns)
+                rows_written += len(columns["player_id"])
+                
+                elapsed = time.perf_counter() - start_time
+                print(f"   {rows_written:>12,} rows  {rows_written / elapsed:>12,.0f} rows/s", end="\r")
+    finally:
+        writer.close()
+    
+    elapsed = time.perf_counter() - start_time
+    print(f"\n✅ Wrote {rows_written:,} rows to {output} in {elapsed:.2f}s ({rows_written / max(elapsed, 1e-9):,.0f} rows/s)")
+    return rows_written
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export top-K similar players for every player")
+    parser.add_argument('--output', required=True, help="Output file (.parquet, .csv or .ndjson)")
+    parser.add_argument('--format', choices=FORMATS, help="Output format (default: from the file extension)")
+    parser.add_argument('--top-n', type=int, default=10, help="Neighbours per player (default 10)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Parallel chunk workers")
+    parser.add_argument('--memory-mb', type=int, default=1024,
+                        help="Budget for in-flight similarity blocks; sets the chunk size (default 1024)")
+    parser.add_argument('--model', default=os.environ.get('MODEL_PATH', 'data/similarity_model.npz'),
+                        help="Persisted model to load (default: MODEL_PATH or data/similarity_model.npz)")
+    parser.add_argument('--retrain', action='store_true', help="Train from the CSV even if a model file exists")
+    parser.add_argument('--with-names', action='store_true', help="Include player and neighbour names")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if fmt == 'jsonl':
+        fmt = 'ndjson'
+    if fmt not in FORMATS:
+        print(f"❌ Cannot infer format from '{args.output}'; use --format {{{','.join(FORMATS)}}}")
+        sys.exit(1)
+    
+    model = load_model(args.model, args.retrain)
+    export_neighbours(model, args.output, fmt, args.top_n, max(1, args.workers), args.memory_mb, args.with_names)
+
+
+if __name__ == '__main__':
+    main()
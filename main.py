@@ -4,31 +4,42 @@ Run this file to start the API service.
 """
 
 # Simply import and run the API
-from api import app, initialize_service
+from api import app, start_background_warmup
 
 if __name__ == '__main__':
     print("🚀 Starting Premier League Midfielder Similarity Finder...")
     
-    # Initialize the service
-    if initialize_service():
-        print("\n" + "="*50)
-        print("🌟 Premier League Midfielder Similarity Finder")
-        print("="*50)
-        print("📍 Server: http://localhost:5000")
-        print("📋 Available endpoints:")
-        print("   GET  /                     - API info")
-        print("   GET  /players              - List all players")
-        print("   GET  /players/<id>         - Player details")
-        print("   GET  /similar/<name>       - Find similar players")
-        print("   POST /similar              - Find similar (JSON)")
-        print("="*50)
-        
-        # Run the Flask development server
-        app.run(
-            debug=True,
-            host='0.0.0.0',
-            port=5000
-        )
-    else:
-        print("❌ Failed to start service due to initialization errors")
-        exit(1)
+    # Load/train the model in the background so probes get answers right away;
+    # data routes return 503 until /readyz reports ready
+    start_background_warmup()
+    
+    print("\n" + "="*50)
+    print("🌟 Premier League Midfielder Similarity Finder")
+    print("="*50)
+    print("📍 Server: http://localhost:5000")
+    print("📋 Available endpoints:")
+    print("   GET  /                     - API info")
+    print("   GET  /livez                - Liveness probe")
+    print("   GET  /readyz               - Readiness probe")
+    print("   GET  /players              - List all players")
+    print("   GET  /players/<id>         - Player details")
+    print("   GET  /players/<id>/referenced-by - Who lists this player as similar")
+    print("   GET  /similar/<name>       - Find similar players")
+    print("   POST /similar              - Find similar (JSON)")
+    print("   POST /similar/batch        - Find similar for many players")
+    print("   GET  /neighbours           - Bulk neighbour export")
+    print("   GET  /compare?a=&b=        - Compare two players")
+    print("   POST /similarity/matrix    - Many-to-many similarity")
+    print("   GET  /map                  - 2D style map with archetypes")
+    print("   GET  /clusters/<id>        - Archetype profile and members")
+    print("   GET  /trajectory/similar/<name> - Similar multi-season trajectories")
+    print("   GET  /metrics              - Prometheus metrics")
+    print("="*50)
+    
+    # Run the Flask development server (the reloader would warm up a second copy)
+    app.run(
+        debug=True,
+        host='0.0.0.0',
+        port=5000,
+        use_reloader=False
+    )
@@ -0,0 +1,128 @@
+"""
+Supervisor that publishes similarity models into shared memory.
+
+Builds (or loads) one model per segment, precomputes its neighbour table and
+publishes the arrays with SharedModelPublisher. API workers started with
+SHARED_MODEL_DIR pointing at the same directory attach read-only views
+instead of each holding a private copy. With --watch, segments whose CSV or
+artifact changed are rebuilt and republished; workers switch to the new
+generation on their next request. Published files are removed on exit.
+
+Usage:
+    python publish_shared_model.py                                # default midfielder model
+    python publish_shared_model.py --segments MF DF FW:2023-24 --watch 60
+    SHARED_MODEL_DIR=/dev/shm/similarity python main.py           # in each worker
+"""
+import argparse
+import os
+import signal
+import sys
+import time
+
+from src.data_loader import get_data_path
+from src.registry import DEFAULT_SEGMENT, build_segment_model, parse_segment, segment_label
+from src.shared_model import DEFAULT_SHARED_DIR, SharedModelPublisher
+from src.model import MAX_CACHED_NEIGHBOURS
+
+
+def parse_segment_spec(spec):
+    """Parse 'POSITION[:SEASON[:COMPETITION]]', e.g. 'DF:2023-24'."""
+    parts = spec.split(':')
+    if len(parts) > 3:
+        raise ValueError(f"Invalid segment '{spec}'. Use POSITION[:SEASON[:COMPETITION]]")
+    return parse_segment(*parts)
+
+
+def segment_fingerprint(segment, model_path):
+    """Modification times that trigger a republish when they change."""
+    data_path = get_data_path(segment.season, segment.competition)
+    return tuple(os.path.getmtime(path) if os.path.exists(path) else None for path in (data_path, model_path))
+
+
+def publish_segment(publisher, segment, model_path, top_n, archetypes):
+    """
+    Build a segment's model, precompute its neighbours and publish it.
+    
+    Returns:
+        int: Published generation
+    """
+    model = build_segment_model(segment, model_path, archetypes)
+    
+    start = time.perf_counter()
+    model.build_neighbour_table(top_n)
+    print(f"🧮 Neighbour table for {segment_label(segment)}: {model.neighbour_table[0].shape} in {time.perf_counter() - start:.2f}s")
+    
+    generation = publisher.publish(model, segment_label(segment))
+    print(f"📡 Published {segment_label(segment)} generation {generation} ({model.memory_usage() / 1024 ** 2:.1f} MB)")
+    return generation
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Publish similarity models into shared memory for API workers")
+    parser.add_argument('--segments', nargs='+', default=['MF'],
+                        help="Segments as POSITION[:SEASON[:COMPETITION]] (default: MF)")
+    parser.add_argument('--shared-dir', default=os.environ.get('SHARED_MODEL_DIR', DEFAULT_SHARED_DIR),
+                        help=f"Shared directory (default: SHARED_MODEL_DIR or {DEFAULT_SHARED_DIR})")
+    parser.add_argument('--model', default=os.environ.get('MODEL_PATH', 'data/similarity_model.npz'),
+                        help="Artifact for the default segment (default: MODEL_PATH or data/similarity_model.npz)")
+    parser.add_argument('--model-dir', default=os.environ.get('REGISTRY_MODEL_DIR', 'data/models'),
+                        help="Artifacts for other segments (default: REGISTRY_MODEL_DIR or data/models)")
+    parser.add_argument('--top-n', type=int, default=MAX_CACHED_NEIGHBOURS,
+                        help=f"Neighbours precomputed per player (default {MAX_CACHED_NEIGHBOURS})")
+    parser.add_argument('--archetypes', type=int,
+                        default=int(os.environ.get('STYLE_MAP_ARCHETYPES', '0')),
+                        help="Style-map archetypes for trained segments, 0 to skip "
+                             "(default: STYLE_MAP_ARCHETYPES or 0)")
+    parser.add_argument('--watch', type=float, default=0,
+                        help="Check for changed data every N seconds and republish (default: publish once and wait)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    
+    try:
+        segments = [parse_segment_spec(spec) for spec in args.segments]
+    except ValueError as e:
+        print(f"❌ {str(e)}")
+        sys.exit(1)
+    
+    model_paths = {
+        segment: args.model if segment == DEFAULT_SEGMENT else os.path.join(args.model_dir, f"{segment_label(segment)}.npz")
+        for segment in segments
+    }
+    
+    # Clean up published files on Ctrl+C and on SIGTERM from a process manager
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    publisher = SharedModelPublisher(args.shared_dir)
+    print(f"📂 Publishing to {args.shared_dir}")
+    
+    try:
+        fingerprints = {}
+        for segment in segments:
+            publish_segment(publisher, segment, model_paths[segment], args.top_n, args.archetypes)
+            fingerprints[segment] = segment_fingerprint(segment, model_paths[segment])
+        
+        print("✅ Models published; press Ctrl+C to unpublish and exit")
+        while True:
+            time.sleep(args.watch or 3600)
+            if not args.watch:
+                continue
+            for segment in segments:
+                fingerprint = segment_fingerprint(segment, model_paths[segment])
+                if fingerprint != fingerprints[segment]:
+                    print(f"🔄 {segment_label(segment)} changed, republishing...")
+                    try:
+                        publish_segment(publisher, segment, model_paths[segment], args.top_n, args.archetypes)
+                    except Exception as e:
+                        print(f"⚠️ Republishing {segment_label(segment)} failed, keeping the previous generation: {str(e)}")
+                    fingerprints[segment] = segment_fingerprint(segment, model_paths[segment])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.close()
+        print("👋 Unpublished shared models")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+# This makes scripts a Python package
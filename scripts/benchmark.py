@@ -0,0 +1,429 @@
+"""
+Latency and throughput benchmark suite for the similarity model and API.
+
+Generates synthetic player catalogs in the same schema that
+`load_real_data()` returns, then measures:
+
+- `train()` wall time and peak memory
+- memory per 10k players: loaded DataFrame vs. the model's compact player store
+- single-query and batch `get_similar_players` latency percentiles
+- `get_player_by_name` lookup latency
+- end-to-end request throughput through Flask's test client
+
+Results are written as a JSON report so two runs (e.g. before and after a
+change) can be diffed with `--compare`.
+
+Usage:
+    python scripts/benchmark.py --sizes 1000,10000 --output bench.json
+    python scripts/benchmark.py --sizes 1000 --compare bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Make the project root importable when run as `python scripts/benchmark.py`
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.model import PlayerSimilarityModel
+
+TEAMS = [
+    'Arsenal', 'Aston Villa', 'Bournemouth', 'Brentford', 'Brighton', 'Chelsea',
+    'Crystal Palace', 'Everton', 'Fulham', 'Ipswich Town', 'Leicester City',
+    'Liverpool', 'Manchester City', 'Manchester Utd', 'Newcastle Utd',
+    "Nott'ham Forest", 'Southampton', 'Tottenham', 'West Ham', 'Wolves'
+]
+POSITIONS = ['MF', 'MF,FW', 'FW,MF', 'MF,DF', 'DF,MF']
+NATIONS = ['eng ENG', 'fra FRA', 'esp ESP', 'bra BRA', 'por POR', 'ger GER', 'ned NED', 'bel BEL']
+
+# Metrics where a higher value is better (everything else is latency/memory)
+HIGHER_IS_BETTER = ('requests_per_second',)
+
+
+def make_synthetic_players(num_players, seed=0):
+    """
+    Build a synthetic catalog with the columns produced by `load_real_data()`.
+
+    Args:
+        num_players (int): Number of players to generate
+        seed (int): Random seed so repeated runs benchmark identical data
+
+    Returns:
+        pd.DataFrame: Player data ready to pass to `PlayerSimilarityModel.train`
+    """
+    rng = np.random.default_rng(seed)
+    n = num_players
+
+    minutes = rng.integers(100, 3420, size=n)
+    nineties = np.round(minutes / 90, 1)
+    goals = rng.poisson(2.5, size=n)
+    assists = rng.poisson(2.0, size=n)
+    penalties = np.minimum(goals, rng.poisson(0.3, size=n))
+    xg = np.round(goals * rng.uniform(0.6, 1.4, size=n), 1)
+    npxg = np.round(np.maximum(xg - penalties * 0.79, 0), 1)
+    xag = np.round(assists * rng.uniform(0.6, 1.4, size=n), 1)
+    prg_c = rng.poisson(25, size=n)
+    prg_p = rng.poisson(80, size=n)
+    prg_r = rng.poisson(60, size=n)
+    age = rng.integers(17, 37, size=n)
+
+    df = pd.DataFrame({
+        'Rk': np.arange(1, n + 1),
+        'player_name': [f"Player {i:06d}" for i in range(n)],
+        'Nation': rng.choice(NATIONS, size=n),
+        'position': rng.choice(POSITIONS, size=n),
+        'team': rng.choice(TEAMS, size=n),
+        'age': age.astype(float),
+        'Born': 2024 - age,
+        'MP': np.maximum(nineties.astype(int), 1),
+        'Starts': np.maximum(nineties.astype(int) - 2, 0),
+        'minutes_played': minutes.astype(float),
+        '90s': nineties,
+        'goals': goals.astype(float),
+        'assists': assists.astype(float),
+        'G+A': goals + assists,
+        'G-PK': goals - penalties,
+        'PK': penalties,
+        'PKatt': penalties,
+        'CrdY': rng.poisson(3, size=n),
+        'CrdR': rng.poisson(0.1, size=n),
+        'xG': xg,
+        'npxG': npxg,
+        'xAG': xag,
+        'npxG+xAG': npxg + xag,
+        'PrgC': prg_c.astype(float),
+        'PrgP': prg_p.astype(float),
+        'PrgR': prg_r.astype(float),
+        'Matches': 'Matches',
+    })
+
+    per_90 = 90 / df['minutes_played']
+    df['Gls_per_90'] = df['goals'] * per_90
+    df['Ast_per_90'] = df['assists'] * per_90
+    df['G+A_per_90'] = df['G+A'] * per_90
+    df['G-PK_per_90'] = df['G-PK'] * per_90
+    df['G+A-PK_per_90'] = (df['G+A'] - df['PK']) * per_90
+    df['xG_per_90'] = df['xG'] * per_90
+    df['xAG_per_90'] = df['xAG'] * per_90
+    df['xG+xAG_per_90'] = (df['xG'] + df['xAG']) * per_90
+    df['npxG_per_90'] = df['npxG'] * per_90
+    df['npxG+xAG_per_90'] = df['npxG+xAG'] * per_90
+
+    # Derived columns, computed exactly as in load_real_data()
+    df['goals_per_90'] = df['Gls_per_90']
+    df['assists_per_90'] = df['Ast_per_90']
+    df['npxG_plus_xAG_per_90'] = df['npxG+xAG_per_90']
+    df['progressive_carries_per_90'] = (df['PrgC'] / df['minutes_played']) * 90
+    df['progressive_passes_per_90'] = (df['PrgP'] / df['minutes_played']) * 90
+    df['progressive_receives_per_90'] = (df['PrgR'] / df['minutes_played']) * 90
+    df['total_contributions'] = df['goals'] + df['assists']
+    df['contributions_per_90'] = df['goals_per_90'] + df['assists_per_90']
+    df['player_id'] = range(1, n + 1)
+
+    return df.reset_index(drop=True)
+
+
+def percentiles(samples_seconds):
+    """
+    Summarize latency samples.
+
+    Args:
+        samples_seconds (list): Latency samples in seconds
+
+    Returns:
+        dict: p50/p95/p99/mean/max in milliseconds
+    """
+    samples_ms = np.asarray(samples_seconds) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(samples_ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples_ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(samples_ms, 99)), 4),
+        "mean_ms": round(float(samples_ms.mean()), 4),
+        "max_ms": round(float(samples_ms.max()), 4),
+    }
+
+
+def time_calls(func, args_list):
+    """Call `func(*args)` for every entry of `args_list` and return per-call latencies."""
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_train(players_data):
+    """
+    Measure training time and peak traced memory.
+
+    Returns:
+        tuple: (trained model or None, result dict)
+    """
+    model = PlayerSimilarityModel()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.train(players_data)
+    except MemoryError:
+        tracemalloc.stop()
+        return None, {"error": "MemoryError"}
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return model, {
+        "seconds": round(elapsed, 4),
+        "peak_memory_mb": round(peak / 1024 ** 2, 2),
+    }
+
+
+def bench_memory(players_data, model):
+    """
+    Compare the loaded DataFrame's footprint with the model's compact player store.
+
+    Returns:
+        dict: Bytes per 10k players before (DataFrame) and after (store + features)
+    """
+    per_10k = 10_000 / len(players_data)
+    dataframe_bytes = int(players_data.memory_usage(deep=True).sum())
+    store_usage = model.players.memory_usage()
+
+    return {
+        "dataframe_mb_per_10k": round(dataframe_bytes * per_10k / 1024 ** 2, 3),
+        "player_store_mb_per_10k": round(store_usage["data"] * per_10k / 1024 ** 2, 3),
+        "player_store_indexes_mb_per_10k": round(store_usage["indexes"] * per_10k / 1024 ** 2, 3),
+        "feature_matrix_mb_per_10k": round(model.normalized_features.nbytes * per_10k / 1024 ** 2, 3),
+    }
+
+
+def bench_queries(model, players_data, num_queries, batch_size, top_n, rng):
+    """Measure single-query, diversity re-ranked, batch and name-lookup latency."""
+    n = len(players_data)
+    indices = rng.integers(0, n, size=num_queries)
+    names = players_data['player_name'].to_numpy()[indices]
+
+    single = time_calls(model.get_similar_players, [(int(i), top_n) for i in indices])
+    
+    # MMR re-ranking: larger candidate pool plus a (pool x pool) product
+    diverse = time_calls(
+        lambda i: model.get_similar_players(i, top_n, diversity_lambda=0.7), [(int(i),) for i in indices]
+    )
+
+    # Batches go through the vectorized multi-player path
+    batches = [indices[i:i + batch_size] for i in range(0, num_queries, batch_size)]
+    batch_samples = time_calls(model.top_k_neighbours, [(batch, top_n) for batch in batches])
+
+    lookups = time_calls(model.get_player_by_name, [(name,) for name in names])
+
+    single_p50 = percentiles(single)["p50_ms"]
+    
+    return {
+        "single_query": percentiles(single),
+        "diverse_query": dict(
+            percentiles(diverse),
+            overhead_vs_single=round(percentiles(diverse)["p50_ms"] / single_p50, 3) if single_p50 else None
+        ),
+        "batch_query": dict(percentiles(batch_samples), batch_size=batch_size),
+        "name_lookup": percentiles(lookups),
+    }
+
+
+def bench_api(model, players_data, num_requests, top_n, rng):
+    """Measure end-to-end request latency and throughput via Flask's test client."""
+    import api
+
+    api.similarity_model = model
+    api.warm_caches()
+    api.service_ready.set()
+    # Every test-client request comes from one address: measure the service, not the rate limit
+    api.admission.enabled = False
+    client = api.app.test_client()
+    n = len(players_data)
+    names = players_data['player_name'].to_numpy()
+    ids = players_data['player_id'].to_numpy()
+
+    routes = {
+        "GET /similar/<name>": lambda i: client.get(f"/similar/{names[i]}?top_n={top_n}"),
+        "POST /similar": lambda i: client.post("/similar", json={"player_name": names[i], "top_n": top_n}),
+        "GET /players/<id>": lambda i: client.get(f"/players/{ids[i]}"),
+    }
+
+    results = {}
+    for route, call in routes.items():
+        indices = rng.integers(0, n, size=num_requests)
+        samples = []
+        errors = 0
+        start = time.perf_counter()
+        for i in indices:
+            request_start = time.perf_counter()
+            response = call(int(i))
+            samples.append(time.perf_counter() - request_start)
+            if response.status_code != 200:
+                errors += 1
+        elapsed = time.perf_counter() - start
+        results[route] = dict(
+            percentiles(samples),
+            requests_per_second=round(num_requests / elapsed, 2),
+            errors=errors
+        )
+
+    # /players serializes the whole catalog, so a handful of requests is enough
+    list_requests = max(1, min(20, num_requests // 10))
+    samples = time_calls(lambda: client.get("/players"), [()] * list_requests)
+    results["GET /players"] = dict(
+        percentiles(samples),
+        requests_per_second=round(list_requests / sum(samples), 2)
+    )
+
+    return results
+
+
+def run_benchmarks(sizes, num_queries, batch_size, top_n, num_requests, seed, skip_api):
+    """
+    Run the full suite for every catalog size.
+
+    Returns:
+        dict: JSON-serializable report
+    """
+    report = {
+        "metadata": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": get_git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "parameters": {
+                "num_queries": num_queries,
+                "batch_size": batch_size,
+                "top_n": top_n,
+                "num_requests": num_requests,
+                "seed": seed,
+            },
+        },
+        "results": {},
+    }
+
+    # Train once up front so the first size doesn't pay for importing scikit-learn
+    bench_train(make_synthetic_players(10, seed=seed))
+
+    for size in sizes:
+        print(f"⏱️  Benchmarking {size} players...")
+        rng = np.random.default_rng(seed)
+        players_data = make_synthetic_players(size, seed=seed)
+
+        model, train_result = bench_train(players_data)
+        size_result = {"train": train_result}
+
+        if model is not None:
+            size_result["memory"] = bench_memory(players_data, model)
+            size_result.update(bench_queries(model, players_data, num_queries, batch_size, top_n, rng))
+            if not skip_api:
+                size_result["api"] = bench_api(model, players_data, num_requests, top_n, rng)
+
+        report["results"][str(size)] = size_result
+        del model, players_data
+
+    return report
+
+
+def get_git_commit():
+    """Return the current git commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=PROJECT_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(result, prefix=""):
+    """Flatten a nested report into {"1000.train.seconds": value} pairs."""
+    flat = {}
+    for key, value in result.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare_reports(baseline, current, threshold):
+    """
+    Print metrics that regressed by more than `threshold` (a fraction).
+
+    Returns:
+        list: Regressed metric paths
+    """
+    old = flatten(baseline["results"])
+    new = flatten(current["results"])
+    regressions = []
+
+    for path in sorted(set(old) & set(new)):
+        if path.endswith(("errors", "batch_size")) or old[path] == 0:
+            continue
+        change = (new[path] - old[path]) / abs(old[path])
+        if path.endswith(HIGHER_IS_BETTER):
+            change = -change
+        if change > threshold:
+            regressions.append(path)
+            print(f"  ❌ {path}: {old[path]} -> {new[path]} ({change:+.1%})")
+
+    if not regressions:
+        print(f"  ✅ No regressions above {threshold:.0%}")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the similarity model and API")
+    parser.add_argument('--sizes', default='1000,5000,20000',
+                        help="Comma-separated catalog sizes (e.g. 1000,10000,200000)")
+    parser.add_argument('--queries', type=int, default=500, help="Model queries per size")
+    parser.add_argument('--batch-size', type=int, default=32, help="Players per batch query")
+    parser.add_argument('--top-n', type=int, default=5, help="Neighbours requested per query")
+    parser.add_argument('--requests', type=int, default=200, help="HTTP requests per route")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for data and queries")
+    parser.add_argument('--skip-api', action='store_true', help="Only benchmark the model")
+    parser.add_argument('--output', default='bench_report.json', help="Where to write the JSON report")
+    parser.add_argument('--compare', help="Baseline report to check for regressions")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="Relative change treated as a regression (default 0.15)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    report = run_benchmarks(
+        sizes, args.queries, args.batch_size, args.top_n, args.requests, args.seed, args.skip_api
+    )
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"📄 Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"🔍 Comparing against {args.compare}:")
+        if compare_reports(baseline, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
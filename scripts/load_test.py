@@ -0,0 +1,467 @@
+"""
+Concurrent load test for the similarity API.
+
+Replays a weighted mix of /players, /players/<id> and GET/POST /similar
+requests against a running server (--url) or against the app served
+locally in-process (a synthetic catalog by default, see --players). Which
+player each request targets follows a Zipf distribution, so a few popular
+players receive most of the traffic as in production.
+
+Two load models:
+
+- closed loop (default): --concurrency workers each send their next request
+  as soon as the previous one returns
+- open loop (--rate): requests are scheduled at a fixed rate regardless of
+  how fast responses come back; latency is measured from the scheduled send
+  time, so queueing delay in an overloaded server is included
+
+Reports throughput, error rate and p50/p95/p99 latency per route as a JSON
+report; two reports (e.g. before and after a change) can be diffed with
+`--compare`.
+
+A live server's admission control limits each client (20 req/s by default)
+and all load-test traffic comes from one client, so start the server under
+test with ADMISSION_CONTROL=0 (or RATE_LIMIT_PER_SECOND=0 to keep only the
+in-flight limit); otherwise most requests are recorded as 429 errors.
+
+Usage:
+    python scripts/load_test.py --duration 30 --concurrency 8 --output load.json
+    python scripts/load_test.py --url http://localhost:5000 --rate 200 --duration 60
+    python scripts/load_test.py --mix similar_get:5,player:1 --compare load.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import requests
+
+# Make the project root importable when run as `python scripts/load_test.py`
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from scripts.benchmark import flatten, get_git_commit, make_synthetic_players, percentiles
+
+# Route name -> report label; the mix refers to routes by name
+ROUTES = {
+    "players": "GET /players",
+    "player": "GET /players/<id>",
+    "similar_get": "GET /similar/<name>",
+    "similar_post": "POST /similar",
+}
+
+DEFAULT_MIX = "players:1,player:3,similar_get:4,similar_post:2"
+
+# Metrics compared across reports; requests_per_second is the only higher-is-better one
+COMPARED_METRICS = ("p50_ms", "p95_ms", "p99_ms", "requests_per_second")
+
+
+def parse_mix(spec):
+    """
+    Parse a traffic mix like 'players:1,similar_get:4' into normalized weights.
+
+    Returns:
+        dict: Route name -> probability
+
+    Raises:
+        ValueError: Unknown route or invalid weight
+    """
+    weights = {}
+    for part in spec.split(','):
+        name, _, weight = part.strip().partition(':')
+        if name not in ROUTES:
+            raise ValueError(f"Unknown route '{name}'. Use one of: {', '.join(ROUTES)}")
+        weights[name] = float(weight or 1)
+        if weights[name] < 0:
+            raise ValueError(f"Negative weight for route '{name}'")
+
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("The traffic mix needs at least one positive weight")
+    return {name: weight / total for name, weight in weights.items() if weight > 0}
+
+
+def zipf_probabilities(num_players, exponent, rng):
+    """
+    Popularity of each player: the r-th most popular gets weight 1 / r**exponent.
+
+    Popularity ranks are assigned in random order so the hot players are not
+    simply the first rows of the catalog. An exponent of 0 is uniform.
+
+    Returns:
+        np.ndarray: Probability per player, shape (num_players,)
+    """
+    weights = 1.0 / np.arange(1, num_players + 1) ** exponent
+    probabilities = np.empty(num_players)
+    probabilities[rng.permutation(num_players)] = weights / weights.sum()
+    return probabilities
+
+
+def build_requests(mix, players, num_requests, zipf_exponent, top_n, seed):
+    """
+    Draw the sequence of requests to send.
+
+    Generating the whole plan up front keeps the random draws out of the
+    timed section and makes two runs with the same seed send the same traffic.
+
+    Args:
+        mix (dict): Route name -> probability
+        players (list): (player_id, player_name) pairs
+        num_requests (int): Length of the plan
+        zipf_exponent (float): Skew of player popularity
+        top_n (int): Neighbours requested by the /similar routes
+        seed (int): Random seed
+
+    Returns:
+        list: (route name, method, path, JSON body or None) tuples
+    """
+    rng = np.random.default_rng(seed)
+    route_names = list(mix)
+    routes = rng.choice(len(route_names), size=num_requests, p=[mix[name] for name in route_names])
+    targets = rng.choice(len(players), size=num_requests, p=zipf_probabilities(len(players), zipf_exponent, rng))
+
+    plan = []
+    for route_index, target in zip(routes.tolist(), targets.tolist()):
+        name = route_names[route_index]
+        player_id, player_name = players[target]
+        if name == "players":
+            plan.append((name, 'GET', "/players", None))
+        elif name == "player":
+            plan.append((name, 'GET', f"/players/{player_id}", None))
+        elif name == "similar_get":
+            plan.append((name, 'GET', f"/similar/{requests.utils.quote(player_name)}?top_n={top_n}", None))
+        else:
+            plan.append((name, 'POST', "/similar", {"player_name": player_name, "top_n": top_n}))
+    return plan
+
+
+def start_local_server(num_players, seed):
+    """
+    Serve the app in-process on a free local port.
+
+    Args:
+        num_players (int): Synthetic catalog size; 0 initializes the service
+            normally (persisted model or the real CSV)
+        seed (int): Random seed for the synthetic catalog
+
+    Returns:
+        str: Base URL of the server
+    """
+    import contextlib
+    import io
+    import logging
+    from werkzeug.serving import make_server
+
+    import api
+
+    if num_players > 0:
+        print(f"🔧 Training on {num_players} synthetic players...")
+        with contextlib.redirect_stdout(io.StringIO()):
+            api.similarity_model.train(make_synthetic_players(num_players, seed=seed))
+        api.warm_caches()
+        api.service_ready.set()
+    elif not api.initialize_service():
+        raise RuntimeError(api.warmup_state["error"])
+
+    # All traffic comes from one client: measure the service, not the per-client rate limit
+    api.admission.client_rate = 0
+
+    # Per-request access logs would cost more than the requests being measured
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def fetch_players(base_url):
+    """
+    List the catalog the server is serving.
+
+    Returns:
+        list: (player_id, player_name) pairs
+    """
+    response = requests.get(f"{base_url}/players", timeout=60)
+    response.raise_for_status()
+    return [(player['player_id'], player['player_name']) for player in response.json()['players']]
+
+
+class LoadRecorder:
+    """
+    Thread-safe collection of per-route latencies and errors.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(lambda: defaultdict(int))
+
+    def record(self, route, seconds, status):
+        """
+        Args:
+            route (str): Route name
+            seconds (float): Request latency
+            status (int or str): HTTP status code, or the exception name for failed requests
+        """
+        with self._lock:
+            self.latencies[route].append(seconds)
+            self.status_codes[route][str(status)] += 1
+            if not isinstance(status, int) or status >= 400:
+                self.errors[route] += 1
+
+
+def send(session, base_url, route_request, timeout):
+    """Send one planned request; returns the status code or the exception name."""
+    _, method, path, body = route_request
+    try:
+        response = session.request(method, f"{base_url}{path}", json=body, timeout=timeout)
+        response.content  # Include reading the body in the latency
+        return response.status_code
+    except requests.RequestException as e:
+        return type(e).__name__
+
+
+def run_closed_loop(base_url, plan, concurrency, duration, timeout, recorder):
+    """
+    Each of `concurrency` workers sends its next request as soon as the
+    previous one completes, until the plan or the duration runs out.
+
+    Returns:
+        float: Elapsed seconds
+    """
+    next_request = iter(range(len(plan)))
+    plan_lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    def worker():
+        session = requests.Session()
+        while deadline is None or time.perf_counter() < deadline:
+            with plan_lock:
+                i = next(next_request, None)
+            if i is None:
+                return
+            request_start = time.perf_counter()
+            status = send(session, base_url, plan[i], timeout)
+            recorder.record(plan[i][0], time.perf_counter() - request_start, status)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def run_open_loop(base_url, plan, rate, concurrency, duration, timeout, recorder):
+    """
+    Send requests at a fixed rate on a pool of `concurrency` connections.
+
+    Latency runs from each request's scheduled send time, so when the server
+    (or the pool) falls behind, the wait shows up in the percentiles instead
+    of silently lowering the offered load.
+
+    Returns:
+        float: Elapsed seconds
+    """
+    sessions = threading.local()
+
+    def call(route_request, scheduled):
+        if not hasattr(sessions, 'session'):
+            sessions.session = requests.Session()
+        status = send(sessions.session, base_url, route_request, timeout)
+        recorder.record(route_request[0], time.perf_counter() - scheduled, status)
+
+    num_requests = len(plan) if not duration else min(len(plan), int(rate * duration))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(num_requests):
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(call, plan[i], scheduled)
+    return time.perf_counter() - start
+
+
+def summarize(recorder, elapsed):
+    """
+    Build per-route and overall results.
+
+    Returns:
+        dict: Route label -> latency percentiles, throughput and error rate
+    """
+    results = {}
+    all_latencies = []
+    all_errors = 0
+
+    for name, label in ROUTES.items():
+        samples = recorder.latencies.get(name)
+        if not samples:
+            continue
+        errors = recorder.errors[name]
+        results[label] = dict(
+            percentiles(samples),
+            requests=len(samples),
+            requests_per_second=round(len(samples) / elapsed, 2),
+            errors=errors,
+            error_rate=round(errors / len(samples), 4),
+            status_codes=dict(recorder.status_codes[name])
+        )
+        all_latencies.extend(samples)
+        all_errors += errors
+
+    if all_latencies:
+        results["overall"] = dict(
+            percentiles(all_latencies),
+            requests=len(all_latencies),
+            requests_per_second=round(len(all_latencies) / elapsed, 2),
+            errors=all_errors,
+            error_rate=round(all_errors / len(all_latencies), 4)
+        )
+    return results
+
+
+def compare_reports(baseline, current, threshold):
+    """
+    Print routes whose latency or throughput regressed by more than
+    `threshold` (a fraction), or whose error rate rose by more than a point.
+
+    Returns:
+        list: Regressed metric paths
+    """
+    old = flatten(baseline["results"])
+    new = flatten(current["results"])
+    regressions = []
+
+    for path in sorted(set(old) & set(new)):
+        if path.endswith("error_rate"):
+            if new[path] - old[path] > 0.01:
+                regressions.append(path)
+                print(f"  ❌ {path}: {old[path]} -> {new[path]}")
+            continue
+        if not path.endswith(COMPARED_METRICS) or old[path] == 0:
+            continue
+        change = (new[path] - old[path]) / abs(old[path])
+        if path.endswith("requests_per_second"):
+            change = -change
+        if change > threshold:
+            regressions.append(path)
+            print(f"  ❌ {path}: {old[path]} -> {new[path]} ({change:+.1%})")
+
+    if not regressions:
+        print(f"  ✅ No regressions above {threshold:.0%}")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'route':<22}{'requests':>10}{'req/s':>10}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, result in results.items():
+        print(f"{label:<22}{result['requests']:>10}{result['requests_per_second']:>10.1f}"
+              f"{result['error_rate']:>9.2%}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the similarity API")
+    parser.add_argument('--url', help="Server to test (default: serve the app locally in-process)")
+    parser.add_argument('--players', type=int, default=1000,
+                        help="Synthetic catalog size for the local server; 0 uses the real data (default 1000)")
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help=f"Route weights, from {', '.join(ROUTES)} (default {DEFAULT_MIX})")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent connections (default 8)")
+    parser.add_argument('--rate', type=float, default=0,
+                        help="Requests per second for an open-loop test (default: closed loop)")
+    parser.add_argument('--duration', type=float, default=30,
+                        help="Seconds to run; 0 runs until --requests are sent (default 30)")
+    parser.add_argument('--requests', type=int, default=100000, help="Maximum requests to send (default 100000)")
+    parser.add_argument('--zipf', type=float, default=1.1,
+                        help="Zipf exponent of player popularity; 0 is uniform (default 1.1)")
+    parser.add_argument('--top-n', type=int, default=5, help="Neighbours requested by /similar (default 5)")
+    parser.add_argument('--timeout', type=float, default=10, help="Per-request timeout in seconds (default 10)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the catalog and traffic")
+    parser.add_argument('--output', default='load_report.json', help="Where to write the JSON report")
+    parser.add_argument('--compare', help="Baseline report to check for regressions")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="Relative change treated as a regression (default 0.15)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"❌ {str(e)}")
+        sys.exit(1)
+
+    base_url = args.url.rstrip('/') if args.url else start_local_server(args.players, args.seed)
+    try:
+        players = fetch_players(base_url)
+    except requests.RequestException as e:
+        print(f"❌ Could not list players from {base_url}: {str(e)}")
+        sys.exit(1)
+
+    num_requests = args.requests
+    if args.rate and args.duration:
+        num_requests = min(num_requests, int(args.rate * args.duration))
+    plan = build_requests(mix, players, num_requests, args.zipf, args.top_n, args.seed)
+
+    mode = f"open loop at {args.rate:g} req/s" if args.rate else "closed loop"
+    print(f"🚦 Load testing {base_url} ({len(players)} players): {mode}, {args.concurrency} connections")
+    recorder = LoadRecorder()
+    if args.rate:
+        elapsed = run_open_loop(base_url, plan, args.rate, args.concurrency, args.duration, args.timeout, recorder)
+    else:
+        elapsed = run_closed_loop(base_url, plan, args.concurrency, args.duration, args.timeout, recorder)
+
+    results = summarize(recorder, elapsed)
+    print_results(results)
+    rate_limited = sum(codes.get('429', 0) for codes in recorder.status_codes.values())
+    if rate_limited:
+        print(f"⚠️  {rate_limited} requests were rate limited (429); start the server with "
+              f"ADMISSION_CONTROL=0 to measure the service rather than the per-client limit")
+
+    report = {
+        "metadata": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": get_git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "target": args.url or "local",
+            "parameters": {
+                "num_players": len(players),
+                "mix": mix,
+                "concurrency": args.concurrency,
+                "rate": args.rate or None,
+                "duration": args.duration,
+                "elapsed_seconds": round(elapsed, 3),
+                "zipf": args.zipf,
+                "top_n": args.top_n,
+                "seed": args.seed,
+            },
+        },
+        "results": results,
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"📄 Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"🔍 Comparing against {args.compare}:")
+        if compare_reports(baseline, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+In-process admission control for the similarity API.
+
+Two limits are checked before a request reaches its route handler:
+
+- an in-flight limit per worker process (MAX_IN_FLIGHT): once that many
+  requests are being served, new ones are rejected immediately with 503
+  instead of queueing behind them
+- a token bucket per client (RATE_LIMIT_PER_SECOND tokens refilled per
+  second, up to RATE_LIMIT_BURST): each request spends tokens according to
+  its cost, so bulk queries (batches, matrices) use up a client's budget
+  proportionally faster; a client without enough tokens gets 429
+
+Clients are identified by their remote address. Behind a reverse proxy,
+list the proxy addresses in ADMISSION_TRUSTED_PROXIES: requests from those
+addresses are charged to the client named in the ADMISSION_CLIENT_HEADER
+header (default X-Client-Id) instead. The header is ignored from any other
+address, so callers cannot dodge their limit by inventing ids. State lives in
+this process only; with several workers each enforces its own limits.
+Set ADMISSION_CONTROL=0 to admit everything.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from src.metrics import metrics
+
+# Why a request was not admitted, and how long the client should wait
+Rejection = namedtuple('Rejection', ['status', 'reason', 'retry_after'])
+
+
+class AdmissionController:
+    """
+    Per-client token buckets plus a per-process in-flight limit.
+    """
+    
+    def __init__(self, enabled=True, client_rate=20.0, client_burst=40.0, max_in_flight=32,
+                 client_header='X-Client-Id', trusted_proxies=(), max_clients=10000, clock=time.monotonic):
+        """
+        Args:
+            enabled (bool): Master switch; when False every request is admitted
+            client_rate (float): Tokens each client regains per second (0 disables rate limiting)
+            client_burst (float): Bucket capacity, i.e. the largest burst a client can send
+            max_in_flight (int): Concurrent requests served by this process (0 for no limit)
+            client_header (str): Request header that identifies the client behind a trusted proxy
+            trusted_proxies (tuple): Remote addresses whose client header is believed
+            max_clients (int): Buckets kept; the least recently seen client is dropped beyond this
+            clock (callable): Monotonic time source in seconds
+        """
+        self.enabled = enabled
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_in_flight = max_in_flight
+        self.client_header = client_header
+        self.trusted_proxies = frozenset(trusted_proxies)
+        self.max_clients = max_clients
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # client -> [tokens, last update], least recently seen first
+        self._in_flight = 0
+    
+    @classmethod
+    def from_env(cls):
+        """Build a controller from the ADMISSION_* / RATE_LIMIT_* / MAX_IN_FLIGHT environment variables."""
+        return cls(
+            enabled=os.environ.get('ADMISSION_CONTROL', '1') != '0',
+            client_rate=float(os.environ.get('RATE_LIMIT_PER_SECOND', '20')),
+            client_burst=float(os.environ.get('RATE_LIMIT_BURST', '40')),
+            max_in_flight=int(os.environ.get('MAX_IN_FLIGHT', '32')),
+            client_header=os.environ.get('ADMISSION_CLIENT_HEADER', 'X-Client-Id'),
+            trusted_proxies=[addr.strip() for addr in os.environ.get('ADMISSION_TRUSTED_PROXIES', '').split(',')
+                             if addr.strip()],
+        )
+    
+    def client_key(self, remote_addr, headers):
+        """
+        Bucket key for a request.
+        
+        Args:
+            remote_addr (str): Address the connection came from
+            headers (Mapping): Request headers
+        
+        Returns:
+            str: The client header when sent through a trusted proxy, else the remote address
+        """
+        remote_addr = remote_addr or 'unknown'
+        if remote_addr in self.trusted_proxies:
+            return headers.get(self.client_header) or remote_addr
+        return remote_addr
+    
+    def admit(self, client_id, cost=1.0):
+        """
+        Decide whether to serve a request; call release() when an admitted one finishes.
+        
+        Rejected requests spend no tokens. A request costing more than the
+        bucket capacity is charged the full capacity, so it is still
+        admitted when the client's bucket is full.
+        
+        Args:
+            client_id (str): Client the request is charged to
+            cost (float): Tokens the request spends
+        
+        Returns:
+            Rejection or None: None when the request is admitted
+        """
+        if not self.enabled:
+            return None
+        
+        rejection = None
+        with self._lock:
+            if self.max_in_flight and self._in_flight >= self.max_in_flight:
+                rejection = Rejection(503, 'overloaded', 1)
+            elif self.client_rate > 0:
+                rejection = self._spend(client_id, min(cost, self.client_burst))
+            
+            if rejection is None:
+                self._in_flight += 1
+            in_flight = self._in_flight
+        
+        if rejection is None:
+            metrics.inc('admission_admitted_total')
+        else:
+            metrics.inc('admission_shed_total', (('reason', rejection.reason),))
+        metrics.set_gauge('admission_in_flight', (), in_flight)
+        return rejection
+    
+    def release(self):
+        """Mark an admitted request as finished."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            in_flight = self._in_flight
+        metrics.set_gauge('admission_in_flight', (), in_flight)
+    
+    def stats(self):
+        """
+        Describe the current limits and load.
+        
+        Returns:
+            dict: Settings, requests in flight and number of tracked clients
+        """
+        with self._lock:
+            in_flight = self._in_flight
+            clients = len(self._buckets)
+        
+        return {
+            "enabled": self.enabled,
+            "in_flight": in_flight,
+            "max_in_flight": self.max_in_flight,
+            "rate_limit_per_second": self.client_rate,
+            "rate_limit_burst": self.client_burst,
+            "tracked_clients": clients
+        }
+    
+    def _spend(self, client_id, cost):
+        """Take tokens from a client's bucket (lock held); return a Rejection if it runs short."""
+        now = self._clock()
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            tokens = self.client_burst
+        else:
+            tokens = min(self.client_burst, bucket[0] + (now - bucket[1]) * self.client_rate)
+            self._buckets.move_to_end(client_id)
+        
+        if tokens < cost:
+            self._buckets[client_id] = [tokens, now]
+            return Rejection(429, 'rate_limited', max(1, math.ceil((cost - tokens) / self.client_rate)))
+        
+        self._buckets[client_id] = [tokens - cost, now]
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return None
+
+
+# Shared controller used by api.py
+admission = AdmissionController.from_env()
@@ -1,16 +1,43 @@
 """
 Data loading and preprocessing module for Premier League midfielder data.
 """
-import pandas as pd
 import numpy as np
 
 
-def load_real_data():
+# Position groups that can be served; 'ALL' keeps every outfield and goalkeeper row
+POSITION_GROUPS = ('GK', 'DF', 'MF', 'FW', 'ALL')
+
+DEFAULT_POSITION = 'MF'
+DEFAULT_SEASON = 'current'
+DEFAULT_COMPETITION = 'premier_league'
+
+
+def get_data_path(season=DEFAULT_SEASON, competition=DEFAULT_COMPETITION):
     """
-    Load REAL Premier League midfielder data from the downloaded CSV file.
+    Get the CSV path for a season and competition.
+    
+    The current Premier League season lives in the original file; other
+    segments follow the pattern data/<competition>_<season>_converted.csv
+    (e.g. data/premier_league_2023-24_converted.csv).
     
     Returns:
-        pd.DataFrame: Cleaned midfielder data with calculated features
+        str: Relative path of the CSV file
+    """
+    if season == DEFAULT_SEASON and competition == DEFAULT_COMPETITION:
+        return 'data/premier_league_data_converted.csv'
+    return f'data/{competition}_{season}_converted.csv'
+
+
+def load_real_data(position=DEFAULT_POSITION, data_path=None):
+    """
+    Load REAL Premier League player data from the downloaded CSV file.
+    
+    Args:
+        position (str): Position group to keep ('MF' by default, see POSITION_GROUPS)
+        data_path (str): CSV to read (defaults to the current Premier League season)
+    
+    Returns:
+        pd.DataFrame: Cleaned player data with calculated features
         
     Real data benefits:
     - 245+ actual Premier League midfielders
@@ -18,10 +45,17 @@ def load_real_data():
     - More accurate similarity recommendations
     - 2023-24 season data
     """
+    # Imported here so code that only needs get_feature_columns() stays pandas-free
+    import pandas as pd
+    
+    if position not in POSITION_GROUPS:
+        raise ValueError(f"Unknown position group '{position}'. Use one of: {', '.join(POSITION_GROUPS)}")
+    data_path = data_path or get_data_path()
+    
     try:
         # Load the full Premier League data with npxG+xAG stats
         print("📊 Loading full Premier League data with npxG+xAG...")
-        df = pd.read_csv('data/premier_league_data_converted.csv', skiprows=1)  # Skip header row
+        df = pd.read_csv(data_path, skiprows=1)  # Skip header row
         
         # Rename columns based on the actual structure
         df.columns = [
@@ -32,10 +66,11 @@ def load_real_data():
             'npxG_per_90', 'npxG+xAG_per_90', 'Matches'
         ]
         
-        # Filter for midfielders only
-        df = df[df['Pos'].str.contains('MF', na=False)]
+        # Filter for the requested position group (midfielders by default)
+        if position != 'ALL':
+            df = df[df['Pos'].str.contains(position, na=False)]
         
-        print(f"✅ Loaded {len(df)} midfielders with npxG+xAG data!")
+        print(f"✅ Loaded {len(df)} {position} players with npxG+xAG data!")
         
         # Clean and prepare the data
         df = df.dropna(subset=['Player', 'npxG+xAG_per_90'])  # Remove rows with missing essential data
@@ -85,7 +120,7 @@ def load_real_data():
             'Min': 'minutes_played'
         })
         
-        print(f"📈 After filtering: {len(df)} midfielders with significant playing time")
+        print(f"📈 After filtering: {len(df)} players with significant playing time")
         print(f"🎯 Teams represented: {df['team'].nunique()}")
         print(f"⚽ Position breakdown: {df['position'].value_counts().to_dict()}")
         
@@ -93,9 +128,9 @@ def load_real_data():
         return df
         
     except FileNotFoundError:
-        print("❌ premier_league_data_converted.csv not found!")
+        print(f"❌ {data_path} not found!")
         print("📍 Please ensure the file exists in the 'data/' folder")
-        raise FileNotFoundError("Required data file not found: data/premier_league_data_converted.csv")
+        raise FileNotFoundError(f"Required data file not found: {data_path}")
     except Exception as e:
         print(f"❌ Error loading data: {str(e)}")
         raise Exception(f"Failed to load data: {str(e)}")
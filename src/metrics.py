@@ -0,0 +1,223 @@
+"""
+Lightweight in-process metrics for the similarity service.
+
+Collects request counters, per-route latency histograms, per-stage timers
+and startup timings, and renders them in the Prometheus text format.
+Set the METRICS_ENABLED environment variable to 0 to turn collection off;
+timers then become a shared no-op object, so instrumented code pays
+only an attribute lookup and a function call.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_PREFIX = "similarity_"
+
+
+class _NullTimer:
+    """No-op context manager used when metrics are disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    """Context manager that records its elapsed time into a histogram."""
+
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, self.labels, time.perf_counter() - self.start)
+        return False
+
+
+class _Histogram:
+    """Cumulative-bucket histogram matching Prometheus semantics."""
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self, num_buckets):
+        self.counts = [0] * num_buckets
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value, buckets):
+        index = bisect_left(buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of counters, gauges and histograms.
+
+    Metrics are identified by name plus a tuple of (label, value) pairs.
+    """
+
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        """Initialize an empty registry."""
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._descriptions = {}
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def describe(self, name, metric_type, help_text):
+        """
+        Register the TYPE and HELP lines for a metric.
+
+        Args:
+            name (str): Metric name without the service prefix
+            metric_type (str): 'counter', 'gauge' or 'histogram'
+            help_text (str): Human readable description
+        """
+        self._descriptions[name] = (metric_type, help_text)
+
+    def inc(self, name, labels=(), value=1):
+        """Increment a counter."""
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, labels, value):
+        """Set a gauge to an absolute value."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[(name, labels)] = value
+
+    def observe(self, name, labels, seconds):
+        """Record one observation (in seconds) into a histogram."""
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(self.buckets))
+            histogram.observe(seconds, self.buckets)
+
+    def stage(self, stage_name):
+        """
+        Time a block of code as a named stage.
+
+        Usage:
+            with metrics.stage('model.top_k'):
+                ...
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, 'stage_duration_seconds', (('stage', stage_name),))
+
+    def record_startup(self, stage_name, seconds):
+        """Record how long a one-off startup step took."""
+        self.set_gauge('startup_seconds', (('stage', stage_name),), seconds)
+
+    def reset(self):
+        """Drop every recorded value (descriptions are kept)."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text, one sample per line
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {
+                key: (list(h.counts), h.total, h.count) for key, h in self._histograms.items()
+            }
+
+        lines = []
+        for metric_type, samples in (('counter', counters), ('gauge', gauges)):
+            for name in sorted({name for name, _ in samples}):
+                self._render_header(lines, name, metric_type)
+                for (sample_name, labels), value in sorted(samples.items()):
+                    if sample_name == name:
+                        lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for name in sorted({name for name, _ in histograms}):
+            self._render_header(lines, name, 'histogram')
+            for (sample_name, labels), (counts, total, count) in sorted(histograms.items()):
+                if sample_name != name:
+                    continue
+                cumulative = 0
+                for upper, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    bucket_labels = labels + (('le', _format_value(upper)),)
+                    lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                inf_labels = labels + (('le', '+Inf'),)
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(inf_labels)} {count}")
+                lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def _render_header(self, lines, name, default_type):
+        metric_type, help_text = self._descriptions.get(name, (default_type, name))
+        lines.append(f"# HELP {METRIC_PREFIX}{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}{name} {metric_type}")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+# Shared registry used by api.py and src/model.py
+metrics = MetricsRegistry(enabled=os.environ.get('METRICS_ENABLED', '1') != '0')
+
+metrics.describe('requests_total', 'counter', "HTTP requests by route, method and status code.")
+metrics.describe('request_duration_seconds', 'histogram', "HTTP request latency by route.")
+metrics.describe('stage_duration_seconds', 'histogram', "Time spent in instrumented hot-path stages.")
+metrics.describe('startup_seconds', 'gauge', "Duration of one-off startup steps.")
+metrics.describe('registry_lookups_total', 'counter', "Segment model lookups by result (hit or miss).")
+metrics.describe('registry_evictions_total', 'counter', "Segment models evicted to stay under the memory budget.")
+metrics.describe('registry_resident_bytes', 'gauge', "Approximate memory held by resident segment models.")
+metrics.describe('registry_resident_models', 'gauge', "Number of resident segment models.")
+metrics.describe('admission_admitted_total', 'counter', "Requests admitted by admission control.")
+metrics.describe('admission_shed_total', 'counter', "Requests rejected by admission control, by reason (rate_limited or overloaded).")
+metrics.describe('admission_in_flight', 'gauge', "Requests currently being served by this process.")
@@ -2,9 +2,18 @@
 Machine learning model for player similarity calculation.
 """
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import StandardScaler
 from src.data_loader import get_feature_columns
+from src.metrics import metrics
+from src.player_store import PlayerStore
+from src.reverse_index import ReverseNeighbourIndex
+from src.style_map import StyleMap
+
+# Neighbour lists are cached this deep, which covers the API's top_n limit
+MAX_CACHED_NEIGHBOURS = 20
+
+# Diversity re-ranking picks from this many candidates per requested neighbour
+# (at least MAX_CACHED_NEIGHBOURS, so warm players are served from the cache)
+MMR_POOL_FACTOR = 4
 
 
 class PlayerSimilarityModel:
@@ -13,33 +22,45 @@ class PlayerSimilarityModel:
     """
     
     def __init__(self):
-        """Initialize the model with a StandardScaler."""
-        self.scaler = StandardScaler()
-        self.similarity_matrix = None
-        self.players_data = None
+        """Initialize an untrained model."""
+        self.feature_means = None
+        self.feature_scales = None
+        self.normalized_features = None
+        self.players = None
+        # (indices, scores) arrays, published in one assignment so concurrent readers never see half a table
+        self.neighbour_table = None
+        self.reverse_index = None
+        self.style_map = None
         self.is_trained = False
-        
-    def train(self, players_data):
+        self._neighbour_cache = {}
+    
+    def train(self, players_data, archetypes=0):
         """
         Train the similarity model on player data.
         
         Args:
             players_data (pd.DataFrame): DataFrame containing player statistics
-            
+            archetypes (int): If > 0, also compute the 2D style map and this many
+                k-means archetypes (see StyleMap); saved with the model
+        
         Returns:
-            np.ndarray: Cosine similarity matrix
-            
+            np.ndarray: Standardized, L2-normalized feature matrix (one row per player)
+        
         Why cosine similarity?
         - Measures angle between vectors, not magnitude
         - Good for different scales (goals vs minutes played)
         - Values between -1 and 1 (easy to interpret)
         - Standard choice for content-based recommendations
+        
+        The full N x N similarity matrix is never materialized: rows are
+        L2-normalized once, so any similarity score is a dot product.
         """
+        # Imported here so serving a persisted model never loads scikit-learn
+        from sklearn.preprocessing import StandardScaler
+        
         if players_data is None or len(players_data) == 0:
             raise ValueError("No data provided for training. Please load player data first.")
         
-        self.players_data = players_data
-        
         # Get feature columns for similarity calculation
         feature_columns = get_feature_columns()
         
@@ -49,58 +70,495 @@ class PlayerSimilarityModel:
             raise ValueError(f"Missing required columns: {missing_columns}")
         
         # Extract feature matrix
-        features = players_data[feature_columns].values
+        features = players_data[feature_columns].to_numpy(dtype=float)
         
         # Check for any NaN values
         if np.isnan(features).any():
             raise ValueError("Feature matrix contains NaN values. Please clean your data first.")
         
         # Normalize features (important for fair comparison)
-        normalized_features = self.scaler.fit_transform(features)
+        scaler = StandardScaler()
+        scaler.fit(features)
         
-        # Calculate cosine similarity matrix
-        self.similarity_matrix = cosine_similarity(normalized_features)
-        self.is_trained = True
+        style_map = None
+        if archetypes > 0 and len(features) >= 2:
+            with metrics.stage('model.style_map'):
+                style_map = StyleMap.fit((features - scaler.mean_) / scaler.scale_, archetypes)
+        
+        # Keep only the served fields in compact form; the caller's DataFrame
+        # (all raw FBref columns) is not retained by the model
+        self._set_state(
+            feature_means=scaler.mean_,
+            feature_scales=scaler.scale_,
+            normalized_features=self._normalize(features, scaler.mean_, scaler.scale_),
+            players=PlayerStore.from_dataframe(players_data),
+            style_map=style_map
+        )
         
-        print("✅ Similarity matrix calculated using only real FBref statistics")
+        print("✅ Similarity features calculated using only real FBref statistics")
         print(f"📊 Model trained on {len(players_data)} players using {len(feature_columns)} features")
+        if style_map is not None:
+            print(f"🗺️ Style map: {style_map.num_archetypes} archetypes, "
+                  f"{style_map.explained_variance.sum():.0%} of variance in 2D")
         
-        return self.similarity_matrix
+        return self.normalized_features
     
-    def get_similar_players(self, player_index, top_n=5):
+    def save(self, path):
+        """
+        Persist the trained model as a NumPy .npz archive.
+        
+        Args:
+            path (str): Destination file path
+        """
+        np.savez(path, **self.to_arrays())
+    
+    def load(self, path):
+        """
+        Load a model written by save(); needs neither pandas nor scikit-learn.
+        
+        Args:
+            path (str): Path to the .npz archive
+        """
+        with np.load(path, allow_pickle=False) as archive:
+            self.load_arrays(archive)
+    
+    def to_arrays(self):
+        """
+        Export the trained model as plain NumPy arrays.
+        
+        Used by save() and by the shared-memory publisher.
+        
+        Returns:
+            dict: Key -> array
+        """
+        if not self.is_trained:
+            raise ValueError("Model not trained. Call train() first.")
+        
+        arrays = {
+            "feature_columns": np.array(get_feature_columns()),
+            "feature_means": self.feature_means,
+            "feature_scales": self.feature_scales,
+            "normalized_features": self.normalized_features
+        }
+        if self.neighbour_table is not None:
+            arrays["neighbour_indices"], arrays["neighbour_scores"] = self.neighbour_table
+        if self.style_map is not None:
+            arrays.update(self.style_map.to_arrays(prefix="style_map__"))
+        arrays.update(self.players.to_arrays(prefix="player__"))
+        return arrays
+    
+    def load_arrays(self, arrays):
+        """
+        Install arrays produced by to_arrays().
+        
+        The arrays are used as given (not copied), so read-only views of
+        shared memory stay zero-copy.
+        
+        Args:
+            arrays (Mapping): Key -> array (an open .npz archive or a dict)
+        """
+        saved_columns = arrays["feature_columns"].tolist()
+        if saved_columns != get_feature_columns():
+            raise ValueError(f"Saved model uses features {saved_columns}, expected {get_feature_columns()}")
+        
+        has_neighbours = "neighbour_indices" in arrays
+        self._set_state(
+            feature_means=arrays["feature_means"],
+            feature_scales=arrays["feature_scales"],
+            normalized_features=arrays["normalized_features"],
+            players=PlayerStore.from_arrays(arrays, prefix="player__"),
+            neighbour_table=(arrays["neighbour_indices"], arrays["neighbour_scores"]) if has_neighbours else None,
+            style_map=StyleMap.from_arrays(arrays, prefix="style_map__") if "style_map__labels" in arrays else None
+        )
+    
+    def get_similar_players(self, player_index, top_n=5, explain=False, diversity_lambda=None):
         """
         Get the most similar players to a given player.
         
         Args:
             player_index (int): Index of the target player
             top_n (int): Number of similar players to return
-            
+            explain (bool): Also return per-feature contributions (see feature_contributions)
+            diversity_lambda (float): If set (0-1), re-rank a larger candidate pool with
+                maximal marginal relevance; 1 keeps the plain ranking, lower values
+                trade similarity to the target for variety among the results
+        
         Returns:
-            list: List of tuples (player_index, similarity_score)
+            list: List of tuples (player_index, similarity_score), or with
+                explain=True a tuple (that list, contributions array of shape (k, num_features))
         """
         if not self.is_trained:
             raise ValueError("Model not trained. Call train() first.")
-            
-        if player_index >= len(self.similarity_matrix):
-            raise ValueError(f"Player index {player_index} out of range. Max index: {len(self.similarity_matrix) - 1}")
         
-        # Get similarity scores for the target player
-        player_similarities = self.similarity_matrix[player_index]
+        num_players = len(self.normalized_features)
+        if player_index >= num_players:
+            raise ValueError(f"Player index {player_index} out of range. Max index: {num_players - 1}")
+        
+        depth = top_n if diversity_lambda is None else max(MAX_CACHED_NEIGHBOURS, MMR_POOL_FACTOR * top_n)
+        
+        with metrics.stage('model.top_k'):
+            top_similar = self._lookup_neighbours(player_index, depth)
+            if top_similar is None:
+                neighbour_indices, neighbour_scores = self.top_k_neighbours([player_index], depth)
+                top_similar = list(zip(neighbour_indices[0].tolist(), neighbour_scores[0].tolist()))
+        
+        if diversity_lambda is not None:
+            with metrics.stage('model.mmr'):
+                top_similar = self._rerank_mmr(top_similar, top_n, diversity_lambda)
+        
+        if not explain:
+            return top_similar
+        
+        with metrics.stage('model.explain'):
+            neighbour_indices = np.array([[index for index, _ in top_similar]], dtype=np.intp)
+            contributions = self.feature_contributions([player_index], neighbour_indices)[0]
+        
+        return top_similar, contributions
+    
+    def feature_contributions(self, player_indices, neighbour_indices):
+        """
+        Break similarity scores down into one term per feature.
+        
+        Rows are standardized and L2-normalized, so the cosine similarity of
+        two players is the sum over features of the product of their
+        components. Each product is that feature's contribution: positive
+        when both players sit on the same side of the league average,
+        negative when they differ, and the terms sum to the similarity score.
+        Only the k neighbour rows are gathered; no similarity pass is redone.
+        
+        Args:
+            player_indices (array-like): Query player rows, shape (m,)
+            neighbour_indices (array-like): Neighbour rows per query, shape (m, k)
+        
+        Returns:
+            np.ndarray: Contributions of shape (m, k, num_features)
+        """
+        query_rows = self.normalized_features[np.asarray(player_indices, dtype=np.intp)]
+        neighbour_rows = self.normalized_features[np.asarray(neighbour_indices, dtype=np.intp)]
+        return neighbour_rows * query_rows[:, None, :]
+    
+    def compare_players(self, index_a, index_b):
+        """
+        Exact similarity of two players with a per-feature breakdown.
+        
+        Uses only the two players' rows: O(num_features), no similarity row.
+        
+        Args:
+            index_a (int): Row index of the first player
+            index_b (int): Row index of the second player
+        
+        Returns:
+            dict: similarity (float) and per-feature arrays values_a, values_b
+                (raw stats), z_delta (difference in standard deviations) and
+                contributions (terms of the cosine score)
+        """
+        if not self.is_trained:
+            raise ValueError("Model not trained. Call train() first.")
+        
+        row_a = self.normalized_features[index_a]
+        row_b = self.normalized_features[index_b]
+        contributions = row_a * row_b
+        
+        values_a = self.feature_values(index_a)
+        values_b = self.feature_values(index_b)
+        
+        return {
+            "similarity": float(contributions.sum()),
+            "values_a": values_a,
+            "values_b": values_b,
+            "z_delta": (values_a - values_b) / self.feature_scales,
+            "contributions": contributions
+        }
+    
+    def similarity_matrix(self, indices_a, indices_b):
+        """
+        Similarity of every player in one list to every player in another.
+        
+        Args:
+            indices_a (array-like): Row indices, shape (m,)
+            indices_b (array-like): Row indices, shape (n,)
+        
+        Returns:
+            np.ndarray: (m x n) cosine similarities from one small matrix product
+        """
+        if not self.is_trained:
+            raise ValueError("Model not trained. Call train() first.")
+        
+        rows_a = self.normalized_features[np.asarray(indices_a, dtype=np.intp)]
+        rows_b = self.normalized_features[np.asarray(indices_b, dtype=np.intp)]
+        return rows_a @ rows_b.T
+    
+    def feature_values(self, player_index):
+        """
+        Raw (unscaled) feature values of one player, in get_feature_columns() order.
+        
+        Returns:
+            np.ndarray: One value per feature
+        """
+        return np.array([self.players.numeric[column][player_index] for column in get_feature_columns()], dtype=float)
+    
+    def _rerank_mmr(self, candidates, top_n, diversity_lambda):
+        """
+        Select a diverse subset of candidates with maximal marginal relevance.
+        
+        Each step picks the candidate maximizing
+        lambda * sim(target, c) - (1 - lambda) * max(sim(c, already picked)),
+        using one (pool x pool) matrix product among the candidates only.
+        
+        Args:
+            candidates (list): (player_index, similarity_score) pairs, best first
+            top_n (int): Number of players to select
+            diversity_lambda (float): Relevance weight between 0 and 1
+        
+        Returns:
+            list: Selected (player_index, similarity_score) pairs in pick order
+        """
+        if len(candidates) <= 1:
+            return candidates[:top_n]
+        
+        pool_indices = np.array([index for index, _ in candidates], dtype=np.intp)
+        relevance = np.array([score for _, score in candidates])
+        pool_rows = self.normalized_features[pool_indices]
+        pairwise = pool_rows @ pool_rows.T
+        
+        # The most similar candidate always goes first
+        picked = [0]
+        is_picked = np.zeros(len(candidates), dtype=bool)
+        is_picked[0] = True
+        max_similarity_to_picked = pairwise[0].copy()
+        
+        for _ in range(min(top_n, len(candidates)) - 1):
+            mmr_scores = diversity_lambda * relevance - (1 - diversity_lambda) * max_similarity_to_picked
+            mmr_scores[is_picked] = -np.inf
+            best = int(np.argmax(mmr_scores))
+            picked.append(best)
+            is_picked[best] = True
+            np.maximum(max_similarity_to_picked, pairwise[best], out=max_similarity_to_picked)
         
-        # Get indices sorted by similarity (excluding the player themselves)
-        similar_indices = np.argsort(player_similarities)[::-1]
+        return [candidates[i] for i in picked]
+    
+    def _lookup_neighbours(self, player_index, top_n):
+        """Neighbours from the precomputed table or cache, or None if not covered."""
+        table = self.neighbour_table
+        if table is not None and top_n <= table[0].shape[1]:
+            neighbour_indices, neighbour_scores = table
+            return list(zip(
+                neighbour_indices[player_index, :top_n].tolist(),
+                neighbour_scores[player_index, :top_n].tolist()
+            ))
+        
+        cached = self._neighbour_cache.get(player_index)
+        if cached is not None and top_n <= len(cached):
+            return cached[:top_n]
+        
+        return None
+    
+    def top_k_neighbours(self, player_indices, top_n):
+        """
+        Compute the top N neighbours for several players in one vectorized pass.
+        
+        Args:
+            player_indices (array-like): Row indices of the query players
+            top_n (int): Neighbours per player (capped at num_players - 1)
+        
+        Returns:
+            tuple: (neighbour_indices, neighbour_scores) arrays of shape
+                (len(player_indices), k), each row sorted by descending similarity
+        """
+        player_indices = np.asarray(player_indices, dtype=np.intp)
+        num_players = len(self.normalized_features)
+        k = max(0, min(top_n, num_players - 1))
+        if k == 0:
+            return np.empty((len(player_indices), 0), dtype=np.intp), np.empty((len(player_indices), 0))
+        
+        # Cosine similarity of each query against every player: one matrix product
+        scores = self.normalized_features[player_indices] @ self.normalized_features.T
+        
+        # Exclude the players themselves (similarity = 1.0)
+        scores[np.arange(len(player_indices)), player_indices] = -np.inf
+        
+        # Partial sort: only the top k candidates per row are fully ordered
+        candidates = np.argpartition(scores, -k, axis=1)[:, -k:]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+        
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+    
+    def precompute_neighbours(self, player_indices, top_n=MAX_CACHED_NEIGHBOURS):
+        """
+        Cache neighbour lists for frequently queried players.
+        
+        Args:
+            player_indices (list): Row indices to warm
+            top_n (int): Depth of each cached list
+        """
+        if not self.is_trained or len(player_indices) == 0:
+            return
+        if self.neighbour_depth() >= top_n:
+            return  # Already answered from the full neighbour table
+        
+        neighbour_indices, neighbour_scores = self.top_k_neighbours(player_indices, top_n)
+        for player_index, indices, scores in zip(player_indices, neighbour_indices.tolist(), neighbour_scores.tolist()):
+            self._neighbour_cache[int(player_index)] = list(zip(indices, scores))
+    
+    def build_neighbour_table(self, top_n=MAX_CACHED_NEIGHBOURS, chunk_size=1024):
+        """
+        Precompute the top N neighbours of every player.
+        
+        The result is two compact (num_players x top_n) arrays instead of a
+        dict of Python lists, so it can be saved with the model or placed in
+        shared memory and answer every get_similar_players() call up to top_n.
+        
+        Args:
+            top_n (int): Neighbours kept per player
+            chunk_size (int): Players scored per matrix product (bounds memory)
+        """
+        if not self.is_trained:
+            raise ValueError("Model not trained. Call train() first.")
+        
+        num_players = len(self.normalized_features)
+        k = max(0, min(top_n, num_players - 1))
+        neighbour_indices = np.empty((num_players, k), dtype=np.int32)
+        neighbour_scores = np.empty((num_players, k), dtype=np.float64)
+        
+        for start in range(0, num_players, chunk_size):
+            stop = min(start + chunk_size, num_players)
+            indices, scores = self.top_k_neighbours(np.arange(start, stop), k)
+            neighbour_indices[start:stop] = indices
+            neighbour_scores[start:stop] = scores
+        
+        self.neighbour_table = (neighbour_indices, neighbour_scores)
+        self.reverse_index = None
+        self._neighbour_cache = {}
+    
+    def neighbour_depth(self):
+        """Neighbours per player in the precomputed table (0 without one)."""
+        table = self.neighbour_table
+        return table[0].shape[1] if table is not None else 0
+    
+    def build_reverse_index(self, top_n=MAX_CACHED_NEIGHBOURS):
+        """
+        Index who lists whom among their top neighbours.
+        
+        Builds the neighbour table first if the model does not have one.
+        
+        Args:
+            top_n (int): Neighbour table depth used when building the table
+        """
+        if self.neighbour_table is None:
+            self.build_neighbour_table(top_n)
+        self.reverse_index = ReverseNeighbourIndex(self.neighbour_table[0])
+    
+    def get_referencing_players(self, player_index):
+        """
+        Find the players that list a player among their most similar.
+        
+        Args:
+            player_index (int): Row index of the referenced player
+        
+        Returns:
+            tuple: (source_indices, ranks, scores) arrays, ordered by descending
+                similarity; ranks are 1-based positions in each source's list
+        """
+        if self.reverse_index is None:
+            self.build_reverse_index()
+        
+        neighbour_indices, neighbour_scores = self.neighbour_table
+        sources = self.reverse_index.sources(player_index).astype(np.intp)
+        if neighbour_indices.shape[1] == 0 or sources.size == 0:
+            # Nobody lists this player (or the catalog is too small to have neighbours)
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=neighbour_scores.dtype)
+        ranks = np.argmax(neighbour_indices[sources] == player_index, axis=1)
+        scores = neighbour_scores[sources, ranks]
+        
+        order = np.argsort(-scores, kind='stable')
+        return sources[order], ranks[order] + 1, scores[order]
+    
+    def add_players(self, players_data):
+        """
+        Add new players to a trained model without retraining.
         
-        # Remove the player themselves (similarity = 1.0)
-        similar_indices = similar_indices[similar_indices != player_index]
+        New rows are scaled with the existing means and scales (the scaler
+        is not refit, so existing scores stay the same). If the model has a
+        neighbour table it is updated exactly: new players get a top-N pass
+        over the whole catalog, while existing players are only scored
+        against the new rows and merged with their current lists. The
+        reverse index is patched for the lists that changed, and new players
+        are placed on the style map without refitting it.
         
-        # Get top N similar players with their scores
-        top_similar = []
-        for i in range(min(top_n, len(similar_indices))):
-            idx = similar_indices[i]
-            score = player_similarities[idx]
-            top_similar.append((idx, score))
+        Args:
+            players_data (pd.DataFrame): New players in the load_real_data() format
+        
+        Returns:
+            int: Number of players added
+        """
+        if not self.is_trained:
+            raise ValueError("Model not trained. Call train() first.")
+        if players_data is None or len(players_data) == 0:
+            return 0
+        
+        feature_columns = get_feature_columns()
+        missing_columns = [col for col in feature_columns if col not in players_data.columns]
+        if missing_columns:
+            raise ValueError(f"Missing required columns: {missing_columns}")
+        
+        features = players_data[feature_columns].to_numpy(dtype=float)
+        if np.isnan(features).any():
+            raise ValueError("Feature matrix contains NaN values. Please clean your data first.")
+        
+        players = self.players.extend(PlayerStore.from_dataframe(players_data))
+        old_count = len(self.normalized_features)
+        
+        if self.style_map is not None:
+            self.style_map = self.style_map.extend((features - self.feature_means) / self.feature_scales)
+        self.normalized_features = np.vstack([
+            self.normalized_features, self._normalize(features, self.feature_means, self.feature_scales)
+        ])
+        self.players = players
+        self._neighbour_cache = {}
+        
+        if self.neighbour_table is not None:
+            self._merge_new_neighbours(old_count)
+        
+        return len(players_data)
+    
+    def _merge_new_neighbours(self, old_count, chunk_size=1024):
+        """Extend the neighbour table (and reverse index) with rows from old_count on."""
+        num_players = len(self.normalized_features)
+        old_indices, old_scores = self.neighbour_table
+        k = old_indices.shape[1]
+        new_indices = np.arange(old_count, num_players)
+        new_rows = self.normalized_features[old_count:]
+        
+        neighbour_indices = np.empty((num_players, k), dtype=np.int32)
+        neighbour_scores = np.empty((num_players, k), dtype=np.float64)
+        
+        # Existing players: the true top k is within (current list + new players)
+        for start in range(0, old_count, chunk_size):
+            stop = min(start + chunk_size, old_count)
+            candidates = np.hstack([old_indices[start:stop], np.broadcast_to(new_indices, (stop - start, len(new_indices)))])
+            candidate_scores = np.hstack([old_scores[start:stop], self.normalized_features[start:stop] @ new_rows.T])
+            order = np.argsort(-candidate_scores, axis=1, kind='stable')[:, :k]
+            neighbour_indices[start:stop] = np.take_along_axis(candidates, order, axis=1)
+            neighbour_scores[start:stop] = np.take_along_axis(candidate_scores, order, axis=1)
+        
+        # New players: a regular top-k pass over the grown catalog
+        for start in range(0, len(new_indices), chunk_size):
+            chunk = new_indices[start:start + chunk_size]
+            indices, scores = self.top_k_neighbours(chunk, k)
+            neighbour_indices[chunk] = indices
+            neighbour_scores[chunk] = scores
+        
+        changed_rows = np.flatnonzero((neighbour_indices[:old_count] != old_indices).any(axis=1)).tolist()
+        
+        self.neighbour_table = (neighbour_indices, neighbour_scores)
         
-        return top_similar
+        if self.reverse_index is not None:
+            self.reverse_index.update(
+                changed_rows + new_indices.tolist(),
+                [old_indices[row] for row in changed_rows] + [()] * len(new_indices),
+                neighbour_indices
+            )
     
     def get_player_by_name(self, player_name):
         """
@@ -108,28 +566,41 @@ class PlayerSimilarityModel:
         
         Args:
             player_name (str): Name of the player to find
-            
+        
         Returns:
             tuple: (player_index, player_data) or (None, None) if not found
         """
         if not self.is_trained:
             raise ValueError("Model not trained. Call train() first.")
         
-        # Find player by exact name match
-        matches = self.players_data[self.players_data['player_name'].str.lower() == player_name.lower()]
+        with metrics.stage('model.get_player_by_name'):
+            player_index = self.players.find_by_name(player_name)
+            
+            if player_index is None:
+                return None, None
         
-        if len(matches) == 0:
-            # Try partial match
-            matches = self.players_data[self.players_data['player_name'].str.contains(player_name, case=False, na=False)]
+        return player_index, self.players.record(player_index)
+    
+    def get_player(self, player_index):
+        """
+        Get the served fields of a player.
         
-        if len(matches) == 0:
-            return None, None
+        Args:
+            player_index (int): Row index of the player
         
-        # Return first match
-        player_data = matches.iloc[0]
-        player_index = matches.index[0]
+        Returns:
+            PlayerRecord: Supports player['field'] and player.field access
+        """
+        return self.players.record(player_index)
+    
+    def get_index_by_id(self, player_id):
+        """
+        Find a player's row index from their player_id.
         
-        return player_index, player_data
+        Returns:
+            int or None: Row index, or None if the id is unknown
+        """
+        return self.players.index_of_id(player_id)
     
     def get_model_info(self):
         """
@@ -145,10 +616,59 @@ class PlayerSimilarityModel:
         
         return {
             "status": "trained",
-            "num_players": len(self.players_data),
+            "num_players": len(self.normalized_features),
             "num_features": len(feature_columns),
             "features": feature_columns,
             "algorithm": "Cosine Similarity",
             "normalization": "StandardScaler",
-            "matrix_shape": self.similarity_matrix.shape
+            "feature_matrix_shape": self.normalized_features.shape,
+            "archetypes": self.style_map.num_archetypes if self.style_map is not None else 0
         }
+    
+    def memory_usage(self):
+        """
+        Approximate memory held by the trained model, in bytes.
+        
+        Counts the feature matrix and scaler arrays, the neighbour table and
+        reverse index, the style map, the player store and the cached
+        neighbour lists.
+        
+        Returns:
+            int: Total byte count
+        """
+        if not self.is_trained:
+            return 0
+        
+        total = self.normalized_features.nbytes + self.feature_means.nbytes + self.feature_scales.nbytes
+        if self.neighbour_table is not None:
+            total += sum(array.nbytes for array in self.neighbour_table)
+        if self.reverse_index is not None:
+            total += self.reverse_index.memory_usage()
+        if self.style_map is not None:
+            total += self.style_map.memory_usage()
+        total += sum(self.players.memory_usage().values())
+        # Each cached entry is a list of (index, score) tuples: ~56 bytes per tuple + 8 per slot
+        total += sum(64 * len(neighbours) for neighbours in self._neighbour_cache.values())
+        return total
+    
+    @staticmethod
+    def _normalize(features, means, scales):
+        """Standardize features, then scale each row to unit length."""
+        scaled = (features - means) / scales
+        norms = np.linalg.norm(scaled, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0  # All-average players keep a zero vector (similarity 0)
+        return scaled / norms
+    
+    def _set_state(self, feature_means, feature_scales, normalized_features, players,
+                   neighbour_table=None, style_map=None):
+        """Install trained or loaded arrays and reset derived caches."""
+        self.feature_means = feature_means
+        self.feature_scales = feature_scales
+        self.normalized_features = normalized_features
+        self.players = players
+        self.neighbour_table = neighbour_table
+        self.style_map = style_map
+        self.reverse_index = None
+        self._neighbour_cache = {}
+        
+        self.is_trained = True
@@ -0,0 +1,267 @@
+"""
+Compact, read-only store of the player fields the API serves.
+
+Built once at train time so the full loaded DataFrame (every raw FBref
+column, object-dtype strings) can be released:
+
+- team, position and nation are categorical codes into small tables of
+  interned strings
+- player names are interned Python strings
+- numeric fields are typed NumPy arrays
+- single players are returned as `PlayerRecord` objects (`__slots__`, no
+  per-instance dict)
+"""
+import sys
+import numpy as np
+
+# Categorical fields: served name -> source DataFrame column
+CATEGORICAL_FIELDS = {
+    'team': 'team',
+    'position': 'position',
+    'nation': 'Nation'
+}
+
+# Numeric fields and the dtype each one is stored as
+INTEGER_FIELDS = ('player_id', 'age', 'goals', 'assists', 'minutes_played', 'total_contributions')
+FLOAT_FIELDS = (
+    'goals_per_90', 'assists_per_90', 'npxG_plus_xAG_per_90',
+    'progressive_carries_per_90', 'progressive_passes_per_90', 'progressive_receives_per_90'
+)
+
+# Every field a PlayerRecord exposes, in API order
+SERVED_FIELDS = ('player_id', 'player_name') + tuple(CATEGORICAL_FIELDS) + INTEGER_FIELDS[1:] + FLOAT_FIELDS
+
+# Columns train() must find in the DataFrame (nation is optional)
+REQUIRED_COLUMNS = ('player_name', 'team', 'position') + INTEGER_FIELDS + FLOAT_FIELDS
+
+
+class PlayerRecord:
+    """
+    One player's served fields.
+    
+    Supports both attribute access (`record.team`) and item access
+    (`record['team']`) so it can stand in for a pandas row.
+    """
+    
+    __slots__ = SERVED_FIELDS
+    
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+    
+    def __getitem__(self, field):
+        return getattr(self, field)
+    
+    def to_dict(self):
+        """Return the record as a plain dictionary."""
+        return {field: getattr(self, field) for field in SERVED_FIELDS}
+    
+    def __repr__(self):
+        return f"PlayerRecord(player_id={self.player_id}, player_name={self.player_name!r})"
+
+
+class PlayerStore:
+    """
+    Columnar store of served player fields with id and name indexes.
+    """
+    
+    def __init__(self, names, categories, codes, numeric):
+        """
+        Args:
+            names (list): Player names, one per row
+            categories (dict): Field -> tuple of category strings
+            codes (dict): Field -> integer code array indexing its categories
+            numeric (dict): Field -> typed value array
+        """
+        self.names = [sys.intern(str(name)) for name in names]
+        self.categories = {field: tuple(sys.intern(str(c)) for c in values) for field, values in categories.items()}
+        self.codes = codes
+        self.numeric = numeric
+        
+        self._lower_names = [name.lower() for name in self.names]
+        self._name_index = {}
+        for i, name in enumerate(self._lower_names):
+            self._name_index.setdefault(name, i)
+        self._id_index = {player_id: i for i, player_id in enumerate(self.numeric['player_id'].tolist())}
+    
+    @classmethod
+    def from_dataframe(cls, players_data):
+        """
+        Build a store from the DataFrame returned by load_real_data().
+        
+        Args:
+            players_data (pd.DataFrame): Loaded player data
+        
+        Returns:
+            PlayerStore: Compact copy of the served fields
+        """
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in players_data.columns]
+        if missing_columns:
+            raise ValueError(f"Missing required columns: {missing_columns}")
+        
+        categories = {}
+        codes = {}
+        for field, column in CATEGORICAL_FIELDS.items():
+            if column in players_data.columns:
+                values = players_data[column].fillna('').astype(str).to_numpy()
+            else:
+                values = np.full(len(players_data), '', dtype=object)
+            uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+            categories[field] = uniques.tolist()
+            codes[field] = inverse.astype(_code_dtype(len(uniques)))
+        
+        numeric = {field: players_data[field].to_numpy().astype(np.int32) for field in INTEGER_FIELDS}
+        numeric.update({field: players_data[field].to_numpy(dtype=np.float64) for field in FLOAT_FIELDS})
+        
+        return cls(players_data['player_name'].astype(str).tolist(), categories, codes, numeric)
+    
+    @classmethod
+    def from_arrays(cls, arrays, prefix=''):
+        """
+        Rebuild a store from the arrays produced by to_arrays().
+        
+        Args:
+            arrays (Mapping): Name -> array (e.g. an open .npz archive)
+            prefix (str): Key prefix used when the arrays were saved
+        """
+        names = arrays[f"{prefix}names"].tolist()
+        categories = {field: arrays[f"{prefix}categories__{field}"].tolist() for field in CATEGORICAL_FIELDS}
+        codes = {field: arrays[f"{prefix}codes__{field}"] for field in CATEGORICAL_FIELDS}
+        numeric = {field: arrays[f"{prefix}{field}"] for field in INTEGER_FIELDS + FLOAT_FIELDS}
+        return cls(names, categories, codes, numeric)
+    
+    def to_arrays(self, prefix=''):
+        """
+        Export the store as plain NumPy arrays (no pickling needed).
+        
+        Returns:
+            dict: Key -> array, suitable for np.savez
+        """
+        arrays = {f"{prefix}names": np.array(self.names, dtype=str)}
+        for field in CATEGORICAL_FIELDS:
+            arrays[f"{prefix}categories__{field}"] = np.array(self.categories[field], dtype=str)
+            arrays[f"{prefix}codes__{field}"] = self.codes[field]
+        for field, values in self.numeric.items():
+            arrays[f"{prefix}{field}"] = values
+        return arrays
+    
+    def extend(self, other):
+        """
+        Return a new store with another store's players appended.
+        
+        Category tables are merged and the appended codes remapped; the
+        existing arrays are not modified (they may be read-only views).
+        
+        Args:
+            other (PlayerStore): Players to append
+        
+        Returns:
+            PlayerStore: Combined store
+        
+        Raises:
+            ValueError: A player_id exists in both stores
+        """
+        duplicate_ids = sorted(set(other._id_index) & set(self._id_index))
+        if duplicate_ids:
+            raise ValueError(f"Players already in the model: {duplicate_ids[:10]}")
+        
+        categories = {}
+        codes = {}
+        for field in CATEGORICAL_FIELDS:
+            merged = list(self.categories[field])
+            lookup = {category: i for i, category in enumerate(merged)}
+            for category in other.categories[field]:
+                if category not in lookup:
+                    lookup[category] = len(merged)
+                    merged.append(category)
+            remap = np.array([lookup[category] for category in other.categories[field]], dtype=np.int64)
+            dtype = _code_dtype(len(merged))
+            appended = remap[other.codes[field]] if len(remap) else np.empty(0, dtype=np.int64)
+            categories[field] = merged
+            codes[field] = np.concatenate([self.codes[field].astype(dtype), appended.astype(dtype)])
+        
+        numeric = {field: np.concatenate([values, other.numeric[field]]) for field, values in self.numeric.items()}
+        return PlayerStore(self.names + other.names, categories, codes, numeric)
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def record(self, index):
+        """
+        Get one player's served fields.
+        
+        Args:
+            index (int): Row index
+        
+        Returns:
+            PlayerRecord: Fields as plain Python values
+        """
+        fields = {'player_name': self.names[index]}
+        for field, codes in self.codes.items():
+            fields[field] = self.categories[field][codes[index]]
+        for field, values in self.numeric.items():
+            fields[field] = values[index].item()
+        return PlayerRecord(**fields)
+    
+    def column(self, field):
+        """
+        Get a whole field as a list of Python values (decoding categories).
+        
+        Args:
+            field (str): Any name in SERVED_FIELDS
+        
+        Returns:
+            list: One value per player
+        """
+        if field == 'player_name':
+            return self.names
+        if field in self.codes:
+            categories = self.categories[field]
+            return [categories[code] for code in self.codes[field].tolist()]
+        return self.numeric[field].tolist()
+    
+    def index_of_id(self, player_id):
+        """Return the row index for a player_id, or None."""
+        return self._id_index.get(player_id)
+    
+    def find_by_name(self, player_name):
+        """
+        Find a player by exact (case-insensitive) name, falling back to a substring match.
+        
+        Returns:
+            int or None: Row index of the first match
+        """
+        query = player_name.lower()
+        player_index = self._name_index.get(query)
+        if player_index is None:
+            player_index = next((i for i, name in enumerate(self._lower_names) if query in name), None)
+        return player_index
+    
+    def memory_usage(self):
+        """
+        Approximate memory held by the store, in bytes.
+        
+        Counts the arrays, the name list and the (shared) category strings;
+        the lookup indexes are reported separately.
+        
+        Returns:
+            dict: Byte counts for 'data' and 'indexes'
+        """
+        data = sum(values.nbytes for values in self.numeric.values())
+        data += sum(codes.nbytes for codes in self.codes.values())
+        data += sys.getsizeof(self.names) + sum(sys.getsizeof(name) for name in self.names)
+        data += sum(sys.getsizeof(c) for values in self.categories.values() for c in values)
+        
+        indexes = sys.getsizeof(self._lower_names) + sum(sys.getsizeof(name) for name in self._lower_names)
+        indexes += sys.getsizeof(self._name_index) + sys.getsizeof(self._id_index)
+        
+        return {"data": data, "indexes": indexes}
+
+
+def _code_dtype(num_categories):
+    """Smallest unsigned integer dtype that can index num_categories values."""
+    if num_categories <= np.iinfo(np.uint8).max + 1:
+        return np.uint8
+    if num_categories <= np.iinfo(np.uint16).max + 1:
+        return np.uint16
+    return np.uint32
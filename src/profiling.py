@@ -0,0 +1,229 @@
+"""
+Opt-in request profiling for the similarity service.
+
+Two capture modes, both enabled with PROFILE_REQUESTS=1:
+
+- Sampled requests (PROFILE_SAMPLE_RATE, fraction 0-1) run under cProfile
+  and are always written as `.prof` files (open with `python -m pstats`
+  or snakeviz).
+- Every other request is watched by a low-overhead stack sampler thread;
+  requests slower than PROFILE_SLOW_MS are written as `.folded` stack
+  files (one "frame;frame;frame count" line per stack, flamegraph format).
+
+Profiles go to PROFILE_DIR and only the newest PROFILE_MAX_FILES are kept.
+"""
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+
+class _StackSampler(threading.Thread):
+    """Background thread that periodically samples the stacks of watched threads."""
+
+    def __init__(self, interval):
+        super().__init__(name="request-stack-sampler", daemon=True)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._watched = {}
+
+    def watch(self, thread_id):
+        """Start collecting stack samples for a thread."""
+        samples = Counter()
+        with self._lock:
+            self._watched[thread_id] = samples
+        return samples
+
+    def unwatch(self, thread_id):
+        """Stop collecting samples for a thread."""
+        with self._lock:
+            self._watched.pop(thread_id, None)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._watched:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._watched.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_fold_stack(frame)] += 1
+
+
+def _fold_stack(frame):
+    """Render a frame's call stack as 'outer;...;inner' for flamegraph tools."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class _ProfileHandle:
+    """Per-request profiling state returned by RequestProfiler.start_request."""
+
+    __slots__ = ('profile', 'samples', 'thread_id')
+
+    def __init__(self, profile=None, samples=None, thread_id=None):
+        self.profile = profile
+        self.samples = samples
+        self.thread_id = thread_id
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and writes the results to disk.
+    """
+
+    def __init__(self, enabled=False, sample_rate=0.0, slow_ms=0.0,
+                 output_dir='profiles', max_files=50, sampler_interval=0.005):
+        """
+        Args:
+            enabled (bool): Master switch; when False every call is a no-op
+            sample_rate (float): Fraction of requests captured with cProfile
+            slow_ms (float): Latency threshold for keeping sampled stacks (0 disables)
+            output_dir (str): Directory that holds the profile files
+            max_files (int): Number of newest profiles kept on disk
+            sampler_interval (float): Seconds between stack samples
+        """
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self._sampler = None
+        self._sampler_interval = sampler_interval
+        # cProfile can only run in one thread at a time on newer Pythons
+        self._cprofile_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build a profiler from the PROFILE_* environment variables."""
+        return cls(
+            enabled=os.environ.get('PROFILE_REQUESTS', '0') == '1',
+            sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '0.01')),
+            slow_ms=float(os.environ.get('PROFILE_SLOW_MS', '500')),
+            output_dir=os.environ.get('PROFILE_DIR', 'profiles'),
+            max_files=int(os.environ.get('PROFILE_MAX_FILES', '50')),
+        )
+
+    def start_request(self):
+        """
+        Begin profiling the current request if it is selected.
+
+        Returns:
+            _ProfileHandle or None: Pass to finish_request when the request ends
+        """
+        if not self.enabled:
+            return None
+
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            if self._cprofile_lock.acquire(blocking=False):
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                    return _ProfileHandle(profile=profile)
+                except ValueError:
+                    # Another profiler is active in this interpreter
+                    self._cprofile_lock.release()
+
+        if self.slow_ms > 0:
+            if self._sampler is None:
+                self._start_sampler()
+            thread_id = threading.get_ident()
+            return _ProfileHandle(samples=self._sampler.watch(thread_id), thread_id=thread_id)
+
+        return None
+
+    def finish_request(self, handle, route, elapsed_seconds):
+        """
+        Stop profiling and persist the profile if it should be kept.
+
+        Args:
+            handle (_ProfileHandle or None): Value returned by start_request
+            route (str): Route rule, used in the file name
+            elapsed_seconds (float): Request latency
+
+        Returns:
+            str or None: Name of the written profile file
+        """
+        if handle is None:
+            return None
+
+        elapsed_ms = elapsed_seconds * 1000
+
+        if handle.profile is not None:
+            handle.profile.disable()
+            self._cprofile_lock.release()
+            path = self._new_path(route, elapsed_ms, 'prof')
+            handle.profile.dump_stats(path)
+            return self._finish_write(path)
+
+        self._sampler.unwatch(handle.thread_id)
+        if elapsed_ms < self.slow_ms or not handle.samples:
+            return None
+
+        path = self._new_path(route, elapsed_ms, 'folded')
+        with open(path, 'w') as f:
+            for stack, count in handle.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return self._finish_write(path)
+
+    def list_profiles(self):
+        """
+        List stored profiles, newest first.
+
+        Returns:
+            list: Dictionaries with file name, size and modification time
+        """
+        if not os.path.isdir(self.output_dir):
+            return []
+
+        profiles = []
+        for entry in os.scandir(self.output_dir):
+            if entry.is_file() and entry.name.endswith(('.prof', '.folded')):
+                stat = entry.stat()
+                profiles.append({
+                    "name": entry.name,
+                    "size_bytes": stat.st_size,
+                    "created": datetime.fromtimestamp(stat.st_mtime).isoformat()
+                })
+        profiles.sort(key=lambda p: p["created"], reverse=True)
+        return profiles
+
+    def _start_sampler(self):
+        with self._write_lock:
+            if self._sampler is None:
+                sampler = _StackSampler(self._sampler_interval)
+                sampler.start()
+                self._sampler = sampler
+
+    def _new_path(self, route, elapsed_ms, extension):
+        os.makedirs(self.output_dir, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+        timestamp = datetime.now().strftime('%Y%m%dT%H%M%S_%f')
+        return os.path.join(self.output_dir, f"{timestamp}_{slug}_{elapsed_ms:.0f}ms.{extension}")
+
+    def _finish_write(self, path):
+        """Apply the rotation policy after writing a new profile."""
+        with self._write_lock:
+            stored = self.list_profiles()
+            for old_profile in stored[self.max_files:]:
+                try:
+                    os.remove(os.path.join(self.output_dir, old_profile["name"]))
+                except FileNotFoundError:
+                    pass
+        return os.path.basename(path)
+
+
+# Shared profiler used by api.py
+profiler = RequestProfiler.from_env()
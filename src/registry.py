@@ -0,0 +1,331 @@
+"""
+Registry of similarity models, one per data segment.
+
+A segment is a (position group, season, competition) triple, e.g.
+('DF', '2023-24', 'premier_league'). Models are built lazily on first use:
+from a persisted artifact in the registry's model directory when it is newer
+than the segment's CSV, otherwise by loading the CSV and training (the
+artifact is then saved for the next start). Resident models are kept in
+least-recently-used order and evicted once their combined size exceeds the
+memory budget, so one process can serve every segment without holding all
+of them at once.
+
+When a shared directory is configured, segments published there by
+publish_shared_model.py are attached as read-only shared-memory views
+instead of being loaded into each worker.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from src.data_loader import (
+    POSITION_GROUPS, DEFAULT_POSITION, DEFAULT_SEASON, DEFAULT_COMPETITION, get_data_path
+)
+from src.metrics import metrics
+from src.model import PlayerSimilarityModel
+from src.shared_model import SharedModelReader, read_manifest
+
+Segment = namedtuple('Segment', ['position', 'season', 'competition'])
+
+DEFAULT_SEGMENT = Segment(DEFAULT_POSITION, DEFAULT_SEASON, DEFAULT_COMPETITION)
+
+# Seasons look like 2023-24; competitions are lowercase slugs (they end up in file names)
+_SEASON_PATTERN = re.compile(r'^(current|\d{4}-\d{2})$')
+_COMPETITION_PATTERN = re.compile(r'^[a-z0-9_]{1,40}$')
+
+
+class SegmentNotFoundError(LookupError):
+    """Raised when a segment has neither a data file nor a persisted model."""
+
+
+def parse_segment(position=None, season=None, competition=None):
+    """
+    Validate segment query parameters, filling in defaults for missing ones.
+    
+    Args:
+        position (str): Position group (GK, DF, MF, FW or ALL)
+        season (str): 'current' or a season like '2023-24'
+        competition (str): Competition slug, e.g. 'premier_league'
+    
+    Returns:
+        Segment: Normalized segment key
+    
+    Raises:
+        ValueError: A parameter is not a valid value
+    """
+    position = (position or DEFAULT_POSITION).upper()
+    season = (season or DEFAULT_SEASON).lower()
+    competition = (competition or DEFAULT_COMPETITION).lower()
+    
+    if position not in POSITION_GROUPS:
+        raise ValueError(f"Unknown position '{position}'. Use one of: {', '.join(POSITION_GROUPS)}")
+    if not _SEASON_PATTERN.match(season):
+        raise ValueError(f"Invalid season '{season}'. Use 'current' or a season like '2023-24'")
+    if not _COMPETITION_PATTERN.match(competition):
+        raise ValueError(f"Invalid competition '{competition}'. Use a lowercase name like 'premier_league'")
+    
+    return Segment(position, season, competition)
+
+
+def segment_label(segment):
+    """File-name friendly label, e.g. 'premier_league_2023-24_DF'."""
+    return f"{segment.competition}_{segment.season}_{segment.position}"
+
+
+def artifact_is_fresh(model_path, data_path, archetypes=0):
+    """
+    Check that a persisted model exists, is newer than its source CSV and
+    has a style map if one is requested.
+    
+    Args:
+        model_path (str): .npz artifact
+        data_path (str): CSV the artifact was trained from
+        archetypes (int): Style-map archetypes wanted (0 when the map is not needed)
+    
+    Returns:
+        bool: True if the artifact can be loaded as is
+    """
+    if not os.path.exists(model_path):
+        return False
+    if os.path.exists(data_path) and os.path.getmtime(model_path) < os.path.getmtime(data_path):
+        return False
+    if archetypes > 0:
+        # Only the archive's directory is read, not the arrays
+        with np.load(model_path) as arrays:
+            return 'style_map__labels' in arrays.files
+    return True
+
+
+def build_segment_model(segment, model_path, archetypes=0):
+    """
+    Load a segment's persisted model, or train one from its CSV and save it.
+    
+    Args:
+        segment (Segment): Segment to build
+        model_path (str): .npz artifact to load from or save to
+        archetypes (int): Style-map archetypes computed when training (0 for none)
+    
+    Returns:
+        PlayerSimilarityModel: Trained model
+    
+    Raises:
+        SegmentNotFoundError: No data for the segment
+    """
+    data_path = get_data_path(segment.season, segment.competition)
+    model = PlayerSimilarityModel()
+    
+    if artifact_is_fresh(model_path, data_path, archetypes):
+        print(f"📦 Loading model for {segment_label(segment)} from {model_path}...")
+        with metrics.stage('registry.load'):
+            model.load(model_path)
+        return model
+    
+    if not os.path.exists(data_path):
+        raise SegmentNotFoundError(f"No data for {segment_label(segment)} (expected {data_path})")
+    
+    # Deferred import: pandas is only loaded when a segment has to be trained
+    from src.data_loader import load_real_data
+    
+    print(f"🔧 Training model for {segment_label(segment)}...")
+    with metrics.stage('registry.train'):
+        players_data = load_real_data(position=segment.position, data_path=data_path)
+        if len(players_data) == 0:
+            raise SegmentNotFoundError(f"No {segment.position} players in {data_path}")
+        model.train(players_data, archetypes=archetypes)
+    
+    try:
+        os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+        model.save(model_path)
+        print(f"💾 Saved model to {model_path}")
+    except OSError as e:
+        print(f"⚠️ Could not save model to {model_path}: {str(e)}")
+    
+    return model
+
+
+class _PendingBuild:
+    """A segment build in progress: waiters queue on the lock and share its outcome."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.error = None  # Set if the build raised, so queued waiters fail fast instead of retrying
+
+
+class ModelRegistry:
+    """
+    Thread-safe LRU cache of trained models keyed by Segment.
+    """
+    
+    def __init__(self, memory_budget_bytes, model_dir='data/models', shared_dir=None, archetypes=0):
+        """
+        Args:
+            memory_budget_bytes (int): Combined size resident models may use
+            model_dir (str): Directory for persisted segment models
+            shared_dir (str): Directory of shared-memory models to attach, if any
+            archetypes (int): Style-map archetypes computed for newly trained segments
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self.model_dir = model_dir
+        self.shared_dir = shared_dir
+        self.archetypes = archetypes
+        self._models = OrderedDict()  # Segment -> (model, size in bytes), oldest first
+        self._shared_readers = {}  # Segment -> SharedModelReader for attached segments
+        self._lock = threading.Lock()
+        self._pending_builds = {}  # Segment -> _PendingBuild while a build is running
+    
+    def get(self, segment):
+        """
+        Get the model for a segment, building or loading it on first use.
+        
+        Concurrent requests for the same missing segment wait for a single
+        build instead of each training their own copy. If that build fails,
+        the requests waiting on it get the same error and the next request
+        starts a fresh attempt.
+        
+        Args:
+            segment (Segment): Key returned by parse_segment()
+        
+        Returns:
+            PlayerSimilarityModel: Trained model
+        
+        Raises:
+            SegmentNotFoundError: No data for the segment
+        """
+        model = self._lookup(segment)
+        if model is not None:
+            metrics.inc('registry_lookups_total', (('result', 'hit'),))
+            return model
+        
+        with self._lock:
+            pending = self._pending_builds.setdefault(segment, _PendingBuild())
+        
+        with pending.lock:
+            if pending.error is not None:
+                raise pending.error
+            
+            # Another request may have finished building while we waited
+            model = self._lookup(segment)
+            if model is not None:
+                metrics.inc('registry_lookups_total', (('result', 'hit'),))
+                return model
+            
+            metrics.inc('registry_lookups_total', (('result', 'miss'),))
+            try:
+                model = self._build(segment)
+                self._insert(segment, model)
+            except Exception as e:
+                pending.error = e
+                raise
+            finally:
+                # Unregister before waiters wake, so only they share this outcome
+                with self._lock:
+                    if self._pending_builds.get(segment) is pending:
+                        del self._pending_builds[segment]
+        return model
+    
+    def stats(self):
+        """
+        Describe the resident models.
+        
+        Returns:
+            dict: Budget, total resident size and one entry per segment (most recent last)
+        """
+        with self._lock:
+            entries = list(self._models.items())
+        
+        return {
+            "memory_budget_mb": round(self.memory_budget_bytes / 1024 ** 2, 1),
+            "resident_mb": round(sum(size for _, (_, size) in entries) / 1024 ** 2, 2),
+            "segments": [
+                {
+                    "position": segment.position,
+                    "season": segment.season,
+                    "competition": segment.competition,
+                    "num_players": len(model.players),
+                    "memory_mb": round(size / 1024 ** 2, 2)
+                }
+                for segment, (model, size) in entries
+            ]
+        }
+    
+    def _lookup(self, segment):
+        with self._lock:
+            entry = self._models.get(segment)
+            if entry is None:
+                return None
+            self._models.move_to_end(segment)
+            reader = self._shared_readers.get(segment)
+        
+        if reader is None:
+            return entry[0]
+        
+        # Shared segments switch to a newly published generation here
+        model = reader.get()
+        if model is not entry[0]:
+            with self._lock:
+                if segment in self._models:
+                    self._models[segment] = (model, entry[1])
+        return model
+    
+    def update_size(self, model):
+        """
+        Re-measure a resident model that grew after insertion (e.g. a lazily
+        built neighbour table or reverse index) and evict others over the budget.
+        
+        Args:
+            model (PlayerSimilarityModel): Model returned by get(); ignored if not resident
+        """
+        with self._lock:
+            segment = next((segment for segment, (resident, _) in self._models.items() if resident is model), None)
+            if segment is None:
+                return
+            self._models[segment] = (model, self._model_size(segment, model))
+            self._models.move_to_end(segment)
+            self._evict_over_budget()
+    
+    def _insert(self, segment, model):
+        """Add a model and evict least recently used ones over the budget."""
+        with self._lock:
+            self._models[segment] = (model, self._model_size(segment, model))
+            self._evict_over_budget()
+    
+    def _model_size(self, segment, model):
+        """Bytes a model costs this process (lock held)."""
+        if segment not in self._shared_readers:
+            return model.memory_usage()
+        # Attached shared models only cost the per-process player indexes and reverse index
+        size = sum(model.players.memory_usage().values())
+        if model.reverse_index is not None:
+            size += model.reverse_index.memory_usage()
+        return size
+    
+    def _evict_over_budget(self):
+        """Drop least recently used models until the rest fit the budget (lock held)."""
+        # The newest model always stays, even if it alone exceeds the budget
+        resident_bytes = sum(size for _, size in self._models.values())
+        while resident_bytes > self.memory_budget_bytes and len(self._models) > 1:
+            evicted, (_, size) = self._models.popitem(last=False)
+            self._shared_readers.pop(evicted, None)
+            resident_bytes -= size
+            metrics.inc('registry_evictions_total')
+            print(f"♻️ Evicted model for {segment_label(evicted)} ({size / 1024 ** 2:.1f} MB)")
+        
+        metrics.set_gauge('registry_resident_bytes', (), resident_bytes)
+        metrics.set_gauge('registry_resident_models', (), len(self._models))
+    
+    def _build(self, segment):
+        """Attach the segment's shared-memory model if published, else load or train it."""
+        label = segment_label(segment)
+        if self.shared_dir and read_manifest(self.shared_dir, label) is not None:
+            reader = SharedModelReader(self.shared_dir, label)
+            model = reader.get()
+            if model is not None:
+                print(f"🔗 Attached shared model for {label} (generation {reader.generation})")
+                with self._lock:
+                    self._shared_readers[segment] = reader
+                return model
+        
+        return build_segment_model(segment, os.path.join(self.model_dir, f"{label}.npz"), self.archetypes)
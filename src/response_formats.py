@@ -0,0 +1,225 @@
+"""
+Content negotiation, bulk encodings and compression for API responses.
+
+Bulk endpoints return tables (one row per player or neighbour). Clients can
+pick the wire format and layout:
+
+- format: `json` (default), `msgpack` or `arrow` (Arrow IPC stream), chosen
+  with `?format=` or the Accept header
+- layout: `rows` (default, list of objects) or `columnar` (one array per
+  field), chosen with `?layout=`; Arrow is always columnar
+
+msgpack and pyarrow are optional dependencies: requesting a format whose
+package is not installed returns 406. Responses above a size threshold are
+compressed with brotli (if installed) or gzip, according to Accept-Encoding.
+"""
+import gzip
+import importlib
+import json
+import os
+
+MIMETYPES = {
+    'json': 'application/json',
+    'msgpack': 'application/msgpack',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+
+# Accept header values mapped to formats, in server preference order
+ACCEPTED_MIMETYPES = {
+    'application/json': 'json',
+    'application/msgpack': 'msgpack',
+    'application/x-msgpack': 'msgpack',
+    'application/vnd.apache.arrow.stream': 'arrow'
+}
+
+# Python package needed for each non-JSON format
+FORMAT_DEPENDENCIES = {'msgpack': 'msgpack', 'arrow': 'pyarrow'}
+
+LAYOUTS = ('rows', 'columnar')
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+
+_optional_modules = {}
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised when a client asks for a format or layout the server can't produce."""
+
+
+def _optional_import(name):
+    """Import an optional dependency once; returns None when it is not installed."""
+    if name not in _optional_modules:
+        try:
+            _optional_modules[name] = importlib.import_module(name)
+        except ImportError:
+            _optional_modules[name] = None
+    return _optional_modules[name]
+
+
+def negotiate(format_param, layout_param, accept_mimetypes):
+    """
+    Decide the response format and layout for a bulk request.
+    
+    Args:
+        format_param (str or None): Value of the ?format= query parameter
+        layout_param (str or None): Value of the ?layout= query parameter
+        accept_mimetypes: Werkzeug MIMEAccept from the request
+    
+    Returns:
+        tuple: (format, layout)
+    
+    Raises:
+        UnsupportedFormatError: Unknown format/layout or missing optional package
+    """
+    if format_param:
+        fmt = format_param.lower()
+        if fmt not in MIMETYPES:
+            raise UnsupportedFormatError(f"Unknown format '{format_param}'. Use one of: {', '.join(MIMETYPES)}")
+    else:
+        best = accept_mimetypes.best_match(list(ACCEPTED_MIMETYPES), default='application/json')
+        fmt = ACCEPTED_MIMETYPES[best]
+    
+    layout = (layout_param or ('columnar' if fmt == 'arrow' else 'rows')).lower()
+    if layout not in LAYOUTS:
+        raise UnsupportedFormatError(f"Unknown layout '{layout_param}'. Use one of: {', '.join(LAYOUTS)}")
+    if fmt == 'arrow' and layout != 'columnar':
+        raise UnsupportedFormatError("Arrow responses are always columnar")
+    
+    dependency = FORMAT_DEPENDENCIES.get(fmt)
+    if dependency and _optional_import(dependency) is None:
+        raise UnsupportedFormatError(f"Format '{fmt}' requires the '{dependency}' package, which is not installed")
+    
+    return fmt, layout
+
+
+def rows_to_columns(rows):
+    """
+    Turn a list of (possibly nested) dictionaries into parallel arrays.
+    
+    Nested dictionaries are flattened with dotted names, e.g.
+    {"key_stats": {"goals": 3}} becomes the column "key_stats.goals".
+    
+    Returns:
+        dict: Column name -> list of values
+    """
+    columns = {}
+    for i, row in enumerate(rows):
+        for name, value in _flatten(row):
+            if name not in columns:
+                columns[name] = [None] * i
+            columns[name].append(value)
+        for values in columns.values():
+            if len(values) < i + 1:
+                values.append(None)
+    return columns
+
+
+def columns_to_rows(columns):
+    """Turn parallel arrays back into a list of flat dictionaries."""
+    names = list(columns)
+    values = [_to_list(columns[name]) for name in names]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def render_table(key, fmt, layout, rows=None, columns=None, meta=None):
+    """
+    Encode a table in the negotiated format.
+    
+    Pass either `rows` (list of dicts) or `columns` (name -> list or NumPy
+    array); the other representation is derived when the layout needs it.
+    
+    Args:
+        key (str): Name of the table in the response envelope (e.g. "players")
+        fmt (str): 'json', 'msgpack' or 'arrow'
+        layout (str): 'rows' or 'columnar'
+        rows (list): Table as row dictionaries
+        columns (dict): Table as parallel arrays
+        meta (dict): Extra top-level fields for the envelope
+    
+    Returns:
+        tuple: (body bytes, mimetype)
+    """
+    meta = meta or {}
+    
+    if layout == 'columnar':
+        if columns is None:
+            columns = rows_to_columns(rows)
+        count = len(next(iter(columns.values()), []))
+        if fmt == 'arrow':
+            return _encode_arrow(columns, dict(meta, count=count)), MIMETYPES['arrow']
+        table = {name: _to_list(values) for name, values in columns.items()}
+    else:
+        if rows is None:
+            rows = columns_to_rows(columns)
+        count = len(rows)
+        table = rows
+    
+    envelope = {"success": True, "count": count, "layout": layout}
+    envelope.update(meta)
+    envelope[key] = table
+    
+    if fmt == 'msgpack':
+        return _optional_import('msgpack').packb(envelope, use_bin_type=True), MIMETYPES['msgpack']
+    return (json.dumps(envelope, separators=(",", ":")) + "\n").encode('utf-8'), MIMETYPES['json']
+
+
+def compress_response(response, accept_encodings, min_bytes=COMPRESSION_MIN_BYTES):
+    """
+    Compress a Flask response in place when it is large enough and the client allows it.
+    
+    Args:
+        response (flask.Response): Outgoing response
+        accept_encodings: Werkzeug Accept object for Accept-Encoding
+        min_bytes (int): Size threshold below which responses are left as-is
+    
+    Returns:
+        flask.Response: The same response object
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or not 200 <= response.status_code < 300):
+        return response
+    
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+    
+    brotli = _optional_import('brotli') if accept_encodings.quality('br') > 0 else None
+    if brotli is not None:
+        compressed, encoding = brotli.compress(body, quality=5), 'br'
+    elif accept_encodings.quality('gzip') > 0:
+        compressed, encoding = gzip.compress(body, compresslevel=6), 'gzip'
+    else:
+        return response
+    
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def _flatten(row, prefix=''):
+    for name, value in row.items():
+        path = f"{prefix}{name}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{path}.")
+        else:
+            yield path, value
+
+
+def _to_list(values):
+    """NumPy arrays -> Python lists (JSON and msgpack need native types)."""
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def _encode_arrow(columns, meta):
+    pa = _optional_import('pyarrow')
+    table = pa.table(
+        {name: pa.array(values) for name, values in columns.items()},
+        metadata={"meta": json.dumps(meta)}
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,348 @@
+"""
+JSON response shapes shared by the Flask API and the in-process Streamlit mode.
+
+Each function turns model output into the plain dictionaries the API
+returns, so both front ends render identical data.
+"""
+import numpy as np
+
+from src.data_loader import get_feature_columns
+
+# Describes the similarity method in every similarity response
+ALGORITHM_INFO = {
+    "method": "Cosine Similarity",
+    "features_used": 6,  # Real features only: goals/90, assists/90, npxG+xAG/90, 3 progressive stats, total_contributions
+    "normalization": "StandardScaler"
+}
+
+# Added to similarity responses requested with explain=true
+EXPLANATION_INFO = {
+    "feature_contributions": "Per-feature terms of the cosine similarity; they sum to similarity_score",
+    "interpretation": "Positive: both players are above (or both below) the league average on that feature. "
+                      "Negative: they sit on opposite sides of it."
+}
+
+
+def build_player_list(players):
+    """
+    Summaries of every player, as served by /players.
+    
+    Args:
+        players (PlayerStore): The model's player store
+        
+    Returns:
+        list: One dictionary per player
+    """
+    # Column-wise zip: no per-row record lookups
+    return [
+        {
+            "player_id": player_id,
+            "player_name": player_name,
+            "team": team,
+            "position": position,
+            "age": age,
+            "goals": goals,
+            "assists": assists
+        }
+        for player_id, player_name, team, position, age, goals, assists in zip(
+            players.column('player_id'), players.column('player_name'),
+            players.column('team'), players.column('position'),
+            players.column('age'), players.column('goals'), players.column('assists')
+        )
+    ]
+
+
+def format_player_details(player):
+    """
+    Detailed statistics for one player, as served by /players/<id>.
+    
+    Args:
+        player (PlayerRecord): Player fields
+        
+    Returns:
+        dict: Player details with basic and advanced stats
+    """
+    return {
+        "player_id": int(player['player_id']),
+        "player_name": player['player_name'],
+        "team": player['team'],
+        "position": player['position'],
+        "nation": player['nation'],
+        "age": int(player['age']),
+        "basic_stats": {
+            "goals": int(player['goals']),
+            "assists": int(player['assists']),
+            "minutes_played": int(player['minutes_played']),
+            "goals_per_90": round(float(player['goals_per_90']), 2),
+            "assists_per_90": round(float(player['assists_per_90']), 2)
+        },
+        "advanced_stats": {
+            "npxG_plus_xAG_per_90": round(float(player['npxG_plus_xAG_per_90']), 2),
+            "progressive_carries_per_90": round(float(player['progressive_carries_per_90']), 2),
+            "progressive_passes_per_90": round(float(player['progressive_passes_per_90']), 2),
+            "progressive_receives_per_90": round(float(player['progressive_receives_per_90']), 2),
+            "total_contributions": int(player['total_contributions'])
+        }
+    }
+
+
+def format_target_player(player):
+    """
+    Short description of the player a similarity query was run for.
+    
+    Args:
+        player (PlayerRecord): Player fields
+        
+    Returns:
+        dict: Name, team and position
+    """
+    return {
+        "name": player['player_name'],
+        "team": player['team'],
+        "position": player['position']
+    }
+
+
+def format_similar_players(model, similar_players, contributions=None):
+    """
+    Convert (player_index, similarity_score) pairs into JSON-ready dictionaries.
+    
+    Args:
+        model (PlayerSimilarityModel): Model the indices refer to
+        similar_players (list): Output of PlayerSimilarityModel.get_similar_players
+        contributions (np.ndarray): Optional per-feature terms, shape (k, num_features)
+        
+    Returns:
+        list: Player dictionaries with key stats (and feature_contributions if given)
+    """
+    results = []
+    
+    for similar_index, similarity_score in similar_players:
+        similar_player = model.get_player(similar_index)
+        results.append({
+            "player_id": int(similar_player['player_id']),
+            "player_name": similar_player['player_name'],
+            "team": similar_player['team'],
+            "position": similar_player['position'],
+            "similarity_score": round(float(similarity_score), 3),
+            "key_stats": {
+                "goals": int(similar_player['goals']),
+                "assists": int(similar_player['assists']),
+                "progressive_passes_per_90": float(similar_player['progressive_passes_per_90']),
+                "npxG_plus_xAG_per_90": float(similar_player['npxG_plus_xAG_per_90'])
+            }
+        })
+    
+    if contributions is not None:
+        feature_columns = get_feature_columns()
+        for result, terms in zip(results, contributions.round(4).tolist()):
+            result["feature_contributions"] = dict(zip(feature_columns, terms))
+    
+    return results
+
+
+def format_comparison(model, index_a, index_b, comparison):
+    """
+    Side-by-side comparison of two players, as served by /compare.
+    
+    Args:
+        model (PlayerSimilarityModel): Model the indices refer to
+        index_a (int): Row index of the first player
+        index_b (int): Row index of the second player
+        comparison (dict): Output of PlayerSimilarityModel.compare_players
+        
+    Returns:
+        dict: Both players, their similarity and per-feature values and deltas
+    """
+    features = {}
+    for i, feature in enumerate(get_feature_columns()):
+        value_a = float(comparison["values_a"][i])
+        value_b = float(comparison["values_b"][i])
+        features[feature] = {
+            "player_a": round(value_a, 3),
+            "player_b": round(value_b, 3),
+            "delta": round(value_a - value_b, 3),
+            "z_delta": round(float(comparison["z_delta"][i]), 3),
+            "contribution": round(float(comparison["contributions"][i]), 4)
+        }
+    
+    return {
+        "player_a": format_matrix_player(model.get_player(index_a)),
+        "player_b": format_matrix_player(model.get_player(index_b)),
+        "similarity_score": round(comparison["similarity"], 3),
+        "features": features
+    }
+
+
+def format_matrix_player(player):
+    """
+    Identify one player in compare and matrix responses.
+    
+    Args:
+        player (PlayerRecord): Player fields
+        
+    Returns:
+        dict: Id, name, team and position
+    """
+    return {
+        "player_id": int(player['player_id']),
+        "player_name": player['player_name'],
+        "team": player['team'],
+        "position": player['position']
+    }
+
+
+def format_trajectory_matches(model, window, matches):
+    """
+    Convert trajectory matches into JSON-ready dictionaries.
+    
+    Args:
+        model (TrajectoryModel): Model the indices refer to
+        window (int): Number of seasons compared
+        matches (list): Output of TrajectoryModel.get_similar_trajectories
+        
+    Returns:
+        list: Player dictionaries with the matched seasons and per-season scores;
+            player_id is the serving catalog's (None if the player is not in it)
+    """
+    results = []
+    for player_index, score, window_start, season_scores in matches:
+        result = format_matrix_player(model.players.record(player_index))
+        result["player_id"] = model.serving_player_id(player_index)
+        result["similarity_score"] = round(score, 3)
+        result["seasons"] = [
+            {"season": season, "similarity_score": round(season_score, 3)}
+            for season, season_score in zip(model.seasons[window_start:window_start + window], season_scores)
+        ]
+        results.append(result)
+    return results
+
+
+def build_player_columns(players):
+    """
+    The /players table as parallel arrays (columnar layout).
+    
+    Args:
+        players (PlayerStore): The model's player store
+        
+    Returns:
+        dict: Field name -> list of values
+    """
+    fields = ('player_id', 'player_name', 'team', 'position', 'age', 'goals', 'assists')
+    return {field: players.column(field) for field in fields}
+
+
+def build_map_columns(model):
+    """
+    The /map table: every player's 2D style-map position and archetype.
+    
+    Args:
+        model (PlayerSimilarityModel): Model with a style map
+        
+    Returns:
+        dict: Column name -> NumPy array or list
+    """
+    players = model.players
+    coordinates = model.style_map.coordinates
+    
+    return {
+        "player_id": players.numeric['player_id'],
+        "player_name": players.names,
+        "team": [players.categories['team'][c] for c in players.codes['team'].tolist()],
+        "position": [players.categories['position'][c] for c in players.codes['position'].tolist()],
+        "x": np.round(coordinates[:, 0].astype(np.float64), 4),
+        "y": np.round(coordinates[:, 1].astype(np.float64), 4),
+        "archetype": model.style_map.labels
+    }
+
+
+def format_archetype(model, archetype_id):
+    """
+    Describe one archetype: size, map position and centroid profile.
+    
+    Args:
+        model (PlayerSimilarityModel): Model with a style map
+        archetype_id (int): Archetype number
+        
+    Returns:
+        dict: Summary with the centroid as z-scores and its most distinctive features
+    """
+    style_map = model.style_map
+    centroid = style_map.centroids[archetype_id]
+    x, y = style_map.centroid_coordinates()[archetype_id].tolist()
+    feature_columns = get_feature_columns()
+    
+    # The features furthest from the league average characterize the archetype
+    defining = sorted(range(len(feature_columns)), key=lambda i: -abs(centroid[i]))[:2]
+    
+    return {
+        "archetype_id": archetype_id,
+        "size": int(style_map.archetype_sizes()[archetype_id]),
+        "map_position": {"x": round(x, 4), "y": round(y, 4)},
+        "centroid": dict(zip(feature_columns, centroid.round(3).tolist())),
+        "defining_features": [
+            {"feature": feature_columns[i], "level": "high" if centroid[i] > 0 else "low", "z": round(float(centroid[i]), 3)}
+            for i in defining
+        ]
+    }
+
+
+def build_similarity_table(model, query_indices, neighbour_indices, neighbour_scores, contributions=None):
+    """
+    Flatten batched neighbour results into one table row per (query, neighbour).
+    
+    Args:
+        model (PlayerSimilarityModel): Model the indices refer to
+        query_indices (np.ndarray): Row index of each query player, shape (m,)
+        neighbour_indices (np.ndarray): Neighbour row indices, shape (m, k)
+        neighbour_scores (np.ndarray): Similarity scores, shape (m, k)
+        contributions (np.ndarray): Optional per-feature terms, shape (m, k, num_features);
+            added as one "contribution.<feature>" column per feature
+        
+    Returns:
+        dict: Column name -> NumPy array or list
+    """
+    players = model.players
+    num_queries, k = neighbour_indices.shape
+    flat_neighbours = neighbour_indices.ravel()
+    query_rows = np.repeat(query_indices, k)
+    
+    player_ids = players.numeric['player_id']
+    team_codes = players.codes['team'][flat_neighbours]
+    position_codes = players.codes['position'][flat_neighbours]
+    
+    columns = {
+        "query_player_id": player_ids[query_rows],
+        "query_player_name": [players.names[i] for i in query_rows.tolist()],
+        "rank": np.tile(np.arange(1, k + 1), num_queries),
+        "player_id": player_ids[flat_neighbours],
+        "player_name": [players.names[i] for i in flat_neighbours.tolist()],
+        "team": [players.categories['team'][c] for c in team_codes.tolist()],
+        "position": [players.categories['position'][c] for c in position_codes.tolist()],
+        "similarity_score": np.round(neighbour_scores.ravel(), 3)
+    }
+    
+    if contributions is not None:
+        flat_contributions = np.round(contributions.reshape(num_queries * k, contributions.shape[-1]), 4)
+        for i, feature in enumerate(get_feature_columns()):
+            columns[f"contribution.{feature}"] = flat_contributions[:, i]
+    
+    return columns
+
+
+def build_neighbour_table(model, player_indices, neighbour_indices, neighbour_scores):
+    """
+    Compact id-only neighbour export: one row per (player, neighbour).
+    
+    Returns:
+        dict: Column name -> NumPy array
+    """
+    player_ids = model.players.numeric['player_id']
+    num_players, k = neighbour_indices.shape
+    
+    return {
+        "player_id": np.repeat(player_ids[player_indices], k),
+        "rank": np.tile(np.arange(1, k + 1, dtype=np.int32), num_players),
+        "neighbour_id": player_ids[neighbour_indices.ravel()],
+        "similarity_score": neighbour_scores.ravel()
+    }
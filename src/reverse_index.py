@@ -0,0 +1,102 @@
+"""
+Reverse neighbour index: for each player, the players that list them among
+their top neighbours.
+
+Built from a model's (num_players x k) neighbour table as a compact inverted
+list (CSR: one sorted array of source rows plus per-player offsets). Only
+membership is stored; ranks and scores are read back from the neighbour
+table at query time, so they always match it. When neighbour lists change
+(new players added), the affected entries are recorded as small per-player
+additions and removals, and the compact arrays are rebuilt once those edits
+exceed a fraction of the index.
+"""
+import numpy as np
+
+# Rebuild the compact arrays once pending edits exceed this share of the entries
+COMPACT_RATIO = 0.25
+
+
+class ReverseNeighbourIndex:
+    """
+    Inverted neighbour lists with incremental updates.
+    """
+    
+    def __init__(self, neighbour_indices):
+        """
+        Args:
+            neighbour_indices (np.ndarray): Neighbour table, shape (num_players, k)
+        """
+        self._build(neighbour_indices)
+    
+    def sources(self, player_index):
+        """
+        Rows whose neighbour list contains a player.
+        
+        Args:
+            player_index (int): Row index of the referenced player
+        
+        Returns:
+            np.ndarray: Source row indices (unordered)
+        """
+        if player_index + 1 < len(self._offsets):
+            sources = self._sources[self._offsets[player_index]:self._offsets[player_index + 1]]
+        else:
+            sources = np.empty(0, dtype=np.int32)  # Added after the last rebuild
+        
+        removed = self._removed.get(player_index)
+        if removed:
+            sources = sources[~np.isin(sources, list(removed))]
+        added = self._added.get(player_index)
+        if added:
+            sources = np.concatenate([sources, np.array(added, dtype=np.int32)])
+        return sources
+    
+    def update(self, changed_rows, old_lists, neighbour_indices):
+        """
+        Record neighbour lists that changed.
+        
+        Args:
+            changed_rows (list): Source rows whose lists changed (or are new)
+            old_lists (list): Previous neighbour list of each row (empty for new rows)
+            neighbour_indices (np.ndarray): The updated neighbour table
+        """
+        for source, old_list in zip(changed_rows, old_lists):
+            old_targets = set(np.asarray(old_list).tolist())
+            new_targets = set(neighbour_indices[source].tolist())
+            
+            for target in old_targets - new_targets:
+                added = self._added.get(target)
+                if added and source in added:
+                    added.remove(source)
+                else:
+                    self._removed.setdefault(target, set()).add(source)
+                self._pending += 1
+            
+            for target in new_targets - old_targets:
+                removed = self._removed.get(target)
+                if removed and source in removed:
+                    removed.discard(source)
+                else:
+                    self._added.setdefault(target, []).append(source)
+                self._pending += 1
+        
+        if self._pending > COMPACT_RATIO * max(1, len(self._sources)):
+            self._build(neighbour_indices)
+    
+    def memory_usage(self):
+        """Approximate bytes held by the compact arrays (pending edits excluded)."""
+        return self._sources.nbytes + self._offsets.nbytes
+    
+    def _build(self, neighbour_indices):
+        num_players, k = neighbour_indices.shape
+        flat_targets = neighbour_indices.ravel()
+        
+        # Stable sort by target keeps each player's sources in row order
+        order = np.argsort(flat_targets, kind='stable')
+        self._sources = (order // max(k, 1)).astype(np.int32)
+        self._offsets = np.zeros(num_players + 1, dtype=np.int64)
+        np.cumsum(np.bincount(flat_targets, minlength=num_players), out=self._offsets[1:])
+        
+        self._added = {}
+        self._removed = {}
+        self._pending = 0
@@ -0,0 +1,225 @@
+"""
+Share trained models between processes through memory-mapped files.
+
+A supervisor process publishes each model's arrays (normalized feature
+matrix, neighbour table, compact player columns) into one flat file per
+generation, by default under /dev/shm so the pages live in shared memory.
+A small JSON manifest per model names the current generation and the
+offset, dtype and shape of every array; it is replaced atomically with
+os.replace(), so readers always see either the old or the new generation.
+
+Worker processes attach read-only NumPy views onto the mapping: the pages
+are shared by every worker instead of being copied, and only small
+per-process structures (name and id indexes) are rebuilt. Readers poll the
+manifest and switch to a new generation on their next request; the old
+mapping is released once no request still uses it.
+"""
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from src.model import PlayerSimilarityModel
+
+# Shared memory on Linux; a temp directory elsewhere
+DEFAULT_SHARED_DIR = '/dev/shm/similarity' if os.path.isdir('/dev/shm') else os.path.join(tempfile.gettempdir(), 'similarity')
+
+# Array offsets are aligned so every view starts on a cache line
+_ALIGNMENT = 64
+
+
+def _manifest_path(directory, label):
+    return os.path.join(directory, f"{label}.json")
+
+
+def read_manifest(directory, label):
+    """
+    Read the manifest of a published model.
+    
+    Returns:
+        dict or None: Manifest, or None if nothing is published under label
+    """
+    try:
+        with open(_manifest_path(directory, label), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class SharedModelPublisher:
+    """
+    Owner side: writes models into shared memory and removes them on close().
+    """
+    
+    def __init__(self, directory=DEFAULT_SHARED_DIR):
+        """
+        Args:
+            directory (str): Where data files and manifests are written
+        """
+        self.directory = directory
+        self._published = {}  # label -> current generation
+        os.makedirs(directory, exist_ok=True)
+    
+    def publish(self, model, label):
+        """
+        Publish a new generation of a model.
+        
+        Args:
+            model (PlayerSimilarityModel): Trained model
+            label (str): Name readers attach to (e.g. a registry segment label)
+        
+        Returns:
+            int: Generation number now visible to readers
+        """
+        arrays = {name: np.ascontiguousarray(values) for name, values in model.to_arrays().items()}
+        
+        previous = read_manifest(self.directory, label)
+        generation = (previous["generation"] if previous else 0) + 1
+        data_file = f"{label}.{generation}.bin"
+        
+        layout = {}
+        offset = 0
+        for name, values in arrays.items():
+            offset = -(-offset // _ALIGNMENT) * _ALIGNMENT
+            layout[name] = {"offset": offset, "dtype": values.dtype.str, "shape": list(values.shape)}
+            offset += values.nbytes
+        
+        with open(os.path.join(self.directory, data_file), 'wb') as f:
+            f.truncate(offset)
+            for name, values in arrays.items():
+                f.seek(layout[name]["offset"])
+                f.write(values.tobytes())
+        
+        manifest = {
+            "generation": generation,
+            "data_file": data_file,
+            "size_bytes": offset,
+            "num_players": len(model.players),
+            "published_at": time.time(),
+            "arrays": layout
+        }
+        manifest_path = _manifest_path(self.directory, label)
+        with open(f"{manifest_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+        
+        # Keep the previous generation for readers that read the old manifest
+        # but have not opened its file yet; mapped files stay valid after unlink
+        self._remove_generations(label, keep=(generation - 1, generation))
+        self._published[label] = generation
+        return generation
+    
+    def close(self):
+        """Unpublish every model this publisher owns."""
+        for label in list(self._published):
+            try:
+                os.remove(_manifest_path(self.directory, label))
+            except FileNotFoundError:
+                pass
+            self._remove_generations(label, keep=())
+        self._published = {}
+    
+    def _remove_generations(self, label, keep):
+        prefix = f"{label}."
+        for file_name in os.listdir(self.directory):
+            if not (file_name.startswith(prefix) and file_name.endswith('.bin')):
+                continue
+            generation = file_name[len(prefix):-len('.bin')]
+            if generation.isdigit() and int(generation) not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, file_name))
+                except OSError:
+                    pass  # Still mapped on platforms that forbid unlinking open files; retried next publish
+
+
+class SharedModelReader:
+    """
+    Worker side: read-only, zero-copy view of a published model.
+    """
+    
+    def __init__(self, directory, label, check_interval=1.0):
+        """
+        Args:
+            directory (str): Directory used by the publisher
+            label (str): Published model name
+            check_interval (float): Seconds between manifest checks
+        """
+        self.directory = directory
+        self.label = label
+        self.check_interval = check_interval
+        self.generation = None
+        self._published_at = None
+        self._model = None
+        self._previous_model = None  # Keeps the last generation's mapping alive across one swap
+        self._last_check = 0.0
+        self._lock = threading.Lock()  # One thread checks the manifest and swaps at a time
+    
+    def get(self):
+        """
+        Get the current model, switching to a newer generation if one was published.
+        
+        Returns:
+            PlayerSimilarityModel or None: None until a model is published
+        """
+        now = time.monotonic()
+        if self._model is None or now - self._last_check >= self.check_interval:
+            with self._lock:
+                # Another thread may have refreshed while we waited for the lock
+                if self._model is None or now - self._last_check >= self.check_interval:
+                    self._last_check = now
+                    self._refresh()
+        return self._model
+    
+    def wait(self, timeout):
+        """
+        Block until a model is published.
+        
+        Args:
+            timeout (float): Seconds to wait
+        
+        Returns:
+            PlayerSimilarityModel or None: None if the timeout expired
+        """
+        deadline = time.monotonic() + timeout
+        while self.get() is None and time.monotonic() < deadline:
+            time.sleep(0.2)
+        return self._model
+    
+    def _refresh(self):
+        """Attach the generation named by the manifest if it changed (lock held)."""
+        for _ in range(3):
+            manifest = read_manifest(self.directory, self.label)
+            # Generations restart at 1 when a supervisor restarts, so compare the publish time too
+            if manifest is None or (manifest["generation"], manifest["published_at"]) == (self.generation, self._published_at):
+                return
+            try:
+                model = self._attach(manifest)
+            except FileNotFoundError:
+                continue  # Superseded while we were opening it; re-read the manifest
+            
+            # A single reference swap: requests already holding the old model finish on it, and
+            # the reader keeps it (and its mapping) until the next generation replaces it
+            self._previous_model = self._model
+            self._model = model
+            self.generation = manifest["generation"]
+            self._published_at = manifest["published_at"]
+            return
+    
+    def _attach(self, manifest):
+        with open(os.path.join(self.directory, manifest["data_file"]), 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        # Views keep the mapping alive; it is unmapped when the model is dropped
+        arrays = {}
+        for name, spec in manifest["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            arrays[name] = np.frombuffer(mapping, dtype=dtype, count=count, offset=spec["offset"]).reshape(spec["shape"])
+        
+        model = PlayerSimilarityModel()
+        model.load_arrays(arrays)
+        return model
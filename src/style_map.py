@@ -0,0 +1,173 @@
+"""
+Precomputed 2D style map and archetype clusters.
+
+Computed once at train time over the standardized features (before the L2
+normalization used for similarity):
+
+- a PCA projection of every player onto the two directions of greatest
+  variance, for scatter plots
+- k-means archetypes: each player's cluster label and distance to its
+  centroid, with centroids kept in standardized units (z-scores), so each
+  archetype reads as "above / below league average" per feature
+
+Everything is stored as plain arrays and saved with the model artifact;
+serving the map or a cluster's members is a slice, not a pass over the data.
+"""
+import numpy as np
+
+# Number of archetypes used when the caller does not choose one
+DEFAULT_ARCHETYPES = 6
+
+_ARRAY_NAMES = ('coordinates', 'labels', 'distances', 'components', 'mean', 'explained_variance', 'centroids')
+
+
+class StyleMap:
+    """
+    PCA coordinates and k-means archetype labels for every player.
+    """
+    
+    def __init__(self, coordinates, labels, distances, components, mean, explained_variance, centroids):
+        """
+        Args:
+            coordinates (np.ndarray): 2D map position per player, shape (num_players, 2)
+            labels (np.ndarray): Archetype id per player, shape (num_players,)
+            distances (np.ndarray): Distance of each player to its archetype centroid
+            components (np.ndarray): PCA axes, shape (2, num_features)
+            mean (np.ndarray): PCA centre in standardized units, shape (num_features,)
+            explained_variance (np.ndarray): Variance ratio captured by each axis, shape (2,)
+            centroids (np.ndarray): Archetype centroids as z-scores, shape (num_archetypes, num_features)
+        """
+        self.coordinates = coordinates
+        self.labels = labels
+        self.distances = distances
+        self.components = components
+        self.mean = mean
+        self.explained_variance = explained_variance
+        self.centroids = centroids
+        
+        # Members of every archetype, most typical (closest to the centroid) first
+        self._member_order = np.lexsort((distances, labels)).astype(np.int32)
+        self._member_offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=len(centroids)), out=self._member_offsets[1:])
+    
+    @classmethod
+    def fit(cls, scaled_features, num_archetypes=DEFAULT_ARCHETYPES, seed=0):
+        """
+        Compute the map and archetypes from standardized features.
+        
+        Archetypes are numbered by size, 0 being the largest, so ids are
+        stable across retrains on similar data.
+        
+        Args:
+            scaled_features (np.ndarray): Standardized features, shape (num_players, num_features)
+            num_archetypes (int): Number of k-means clusters (capped at num_players)
+            seed (int): Random seed for k-means initialization
+        
+        Returns:
+            StyleMap: Fitted map
+        """
+        # Imported here so serving a persisted model never loads scikit-learn
+        from sklearn.cluster import KMeans
+        from sklearn.decomposition import PCA
+        
+        if len(scaled_features) < 2:
+            raise ValueError("The style map needs at least 2 players")
+        
+        pca = PCA(n_components=2, random_state=seed).fit(scaled_features)
+        
+        num_archetypes = max(1, min(num_archetypes, len(scaled_features)))
+        kmeans = KMeans(n_clusters=num_archetypes, n_init=10, random_state=seed).fit(scaled_features)
+        
+        order = np.argsort(-np.bincount(kmeans.labels_, minlength=num_archetypes), kind='stable')
+        relabel = np.empty(num_archetypes, dtype=np.int32)
+        relabel[order] = np.arange(num_archetypes, dtype=np.int32)
+        labels = relabel[kmeans.labels_]
+        centroids = kmeans.cluster_centers_[order]
+        
+        return cls(
+            coordinates=pca.transform(scaled_features).astype(np.float32),
+            labels=labels,
+            distances=np.linalg.norm(scaled_features - centroids[labels], axis=1).astype(np.float32),
+            components=pca.components_,
+            mean=pca.mean_,
+            explained_variance=pca.explained_variance_ratio_,
+            centroids=centroids
+        )
+    
+    @classmethod
+    def from_arrays(cls, arrays, prefix=''):
+        """
+        Rebuild a map from the arrays produced by to_arrays().
+        
+        Args:
+            arrays (Mapping): Name -> array (e.g. an open .npz archive)
+            prefix (str): Key prefix used when the arrays were saved
+        """
+        return cls(**{name: arrays[f"{prefix}{name}"] for name in _ARRAY_NAMES})
+    
+    def to_arrays(self, prefix=''):
+        """
+        Export the map as plain NumPy arrays.
+        
+        Returns:
+            dict: Key -> array, suitable for np.savez
+        """
+        return {f"{prefix}{name}": getattr(self, name) for name in _ARRAY_NAMES}
+    
+    def extend(self, scaled_features):
+        """
+        Return a new map with more players placed on it.
+        
+        New players are projected onto the existing axes and assigned to the
+        nearest existing centroid; nothing is refit, so existing players keep
+        their positions and labels.
+        
+        Args:
+            scaled_features (np.ndarray): Standardized features of the new players
+        
+        Returns:
+            StyleMap: Combined map
+        """
+        coordinates = ((scaled_features - self.mean) @ self.components.T).astype(np.float32)
+        centroid_distances = np.linalg.norm(scaled_features[:, None, :] - self.centroids[None, :, :], axis=2)
+        labels = centroid_distances.argmin(axis=1).astype(self.labels.dtype)
+        distances = centroid_distances[np.arange(len(labels)), labels].astype(np.float32)
+        
+        return StyleMap(
+            coordinates=np.vstack([self.coordinates, coordinates]),
+            labels=np.concatenate([self.labels, labels]),
+            distances=np.concatenate([self.distances, distances]),
+            components=self.components,
+            mean=self.mean,
+            explained_variance=self.explained_variance,
+            centroids=self.centroids
+        )
+    
+    @property
+    def num_archetypes(self):
+        return len(self.centroids)
+    
+    def members(self, archetype_id):
+        """
+        Players in an archetype, closest to its centroid first.
+        
+        Args:
+            archetype_id (int): Archetype number
+        
+        Returns:
+            np.ndarray: Player row indices
+        """
+        return self._member_order[self._member_offsets[archetype_id]:self._member_offsets[archetype_id + 1]]
+    
+    def archetype_sizes(self):
+        """Number of players in each archetype."""
+        return np.diff(self._member_offsets)
+    
+    def centroid_coordinates(self):
+        """Map position of each archetype centroid, shape (num_archetypes, 2)."""
+        return (self.centroids - self.mean) @ self.components.T
+    
+    def memory_usage(self):
+        """Bytes held by the map arrays and the member ordering."""
+        total = sum(getattr(self, name).nbytes for name in _ARRAY_NAMES)
+        return total + self._member_order.nbytes + self._member_offsets.nbytes
@@ -0,0 +1,297 @@
+"""
+Cross-season trajectory similarity.
+
+load_real_data() gives one row per player for a single season. A trajectory
+model loads several seasons of the same competition and position group and
+represents each player by the sequence of their feature vectors, one per
+season:
+
+- features are standardized with one scaler fitted on every player-season,
+  so a season's values are comparable across years, then each player-season
+  row is L2-normalized
+- the sequences are stored as a padded (num_players, num_seasons,
+  num_features) array plus a (num_players, num_seasons) mask of the seasons
+  each player actually played
+
+Two players' trajectories are compared over aligned windows of W
+consecutive seasons: the score is the mean of the per-season cosine
+similarities. A query scores every player (and, with align='any', every
+window position) in one batched NumPy operation.
+"""
+import os
+import re
+
+import numpy as np
+
+from src.data_loader import DEFAULT_SEASON, get_data_path, get_feature_columns
+from src.metrics import metrics
+from src.model import PlayerSimilarityModel
+from src.player_store import PlayerStore
+from src.registry import SegmentNotFoundError
+
+# 'recent': compare the same calendar seasons as the query window;
+# 'any': compare against every window of each player's career
+ALIGNMENTS = ('recent', 'any')
+
+
+def season_sort_key(season):
+    """Chronological order: '2022-23' before '2023-24', 'current' last."""
+    return (season == DEFAULT_SEASON, season)
+
+
+def discover_seasons(competition):
+    """
+    Seasons with a data file for a competition.
+    
+    Args:
+        competition (str): Competition slug, e.g. 'premier_league'
+    
+    Returns:
+        list: Seasons, oldest first ('current' last)
+    """
+    data_dir = os.path.dirname(get_data_path(DEFAULT_SEASON, competition)) or '.'
+    pattern = re.compile(rf'^{re.escape(competition)}_(\d{{4}}-\d{{2}})_converted\.csv$')
+    
+    seasons = []
+    if os.path.isdir(data_dir):
+        seasons = [match.group(1) for match in map(pattern.match, os.listdir(data_dir)) if match]
+    if os.path.exists(get_data_path(DEFAULT_SEASON, competition)):
+        seasons.append(DEFAULT_SEASON)
+    return sorted(seasons, key=season_sort_key)
+
+
+def build_trajectory_model(position, competition, seasons=None):
+    """
+    Load every season of a competition and train a trajectory model.
+    
+    Args:
+        position (str): Position group (see POSITION_GROUPS)
+        competition (str): Competition slug
+        seasons (list): Seasons to load (default: every season with a data file)
+    
+    Returns:
+        TrajectoryModel: Trained model
+    
+    Raises:
+        SegmentNotFoundError: No data for the requested seasons
+    """
+    # Deferred import: pandas is only loaded when a trajectory model is built
+    from src.data_loader import load_real_data
+    
+    seasons = sorted(seasons or discover_seasons(competition), key=season_sort_key)
+    if not seasons:
+        raise SegmentNotFoundError(f"No season data for {competition}")
+    
+    season_frames = []
+    for season in seasons:
+        data_path = get_data_path(season, competition)
+        if not os.path.exists(data_path):
+            raise SegmentNotFoundError(f"No data for {competition} {season} (expected {data_path})")
+        season_frames.append((season, load_real_data(position=position, data_path=data_path)))
+    
+    model = TrajectoryModel()
+    with metrics.stage('trajectory.train'):
+        model.train(season_frames)
+    return model
+
+
+class TrajectoryModel:
+    """
+    Per-player season sequences with masked, windowed similarity.
+    """
+    
+    def __init__(self):
+        """Initialize an untrained model."""
+        self.seasons = []
+        self.feature_means = None
+        self.feature_scales = None
+        self.features = None  # (num_players, num_seasons, num_features), zero where masked
+        self.mask = None  # (num_players, num_seasons) bool
+        self.players = None  # Each player's most recent season; player_id is internal to this model
+        self.player_ids = None  # player_id in the serving catalog (see link_player_ids), -1 if absent
+        self.is_trained = False
+    
+    def train(self, season_frames):
+        """
+        Build the padded trajectory array from several seasons of player data.
+        
+        Players are matched across seasons by name. A player listed more than
+        once in a season (a mid-season transfer) keeps the row with the most
+        minutes.
+        
+        Args:
+            season_frames (list): (season, DataFrame from load_real_data()) pairs, oldest first
+        """
+        # Imported here so serving never loads pandas or scikit-learn
+        import pandas as pd
+        from sklearn.preprocessing import StandardScaler
+        
+        feature_columns = get_feature_columns()
+        frames = []
+        for season_number, (season, players_data) in enumerate(season_frames):
+            missing_columns = [col for col in feature_columns if col not in players_data.columns]
+            if missing_columns:
+                raise ValueError(f"Missing required columns in {season}: {missing_columns}")
+            frame = players_data.assign(
+                _season=season_number, _key=players_data['player_name'].astype(str).str.strip().str.lower()
+            )
+            frames.append(frame.sort_values('minutes_played', ascending=False).drop_duplicates('_key'))
+        
+        rows = pd.concat(frames, ignore_index=True)
+        if len(rows) == 0:
+            raise ValueError("No data provided for training. Please load player data first.")
+        
+        features = rows[feature_columns].to_numpy(dtype=float)
+        if np.isnan(features).any():
+            raise ValueError("Feature matrix contains NaN values. Please clean your data first.")
+        
+        scaler = StandardScaler()
+        scaler.fit(features)
+        
+        keys, player_rows = np.unique(rows['_key'].to_numpy(), return_inverse=True)
+        season_numbers = rows['_season'].to_numpy()
+        
+        trajectories = np.zeros((len(keys), len(season_frames), len(feature_columns)))
+        trajectories[player_rows, season_numbers] = PlayerSimilarityModel._normalize(
+            features, scaler.mean_, scaler.scale_
+        )
+        mask = np.zeros((len(keys), len(season_frames)), dtype=bool)
+        mask[player_rows, season_numbers] = True
+        
+        # Served fields come from each player's latest season, in key order; the
+        # ids numbered here only index this store and are never served
+        latest = rows.assign(_row=player_rows).sort_values('_season').drop_duplicates('_row', keep='last')
+        latest = latest.sort_values('_row').assign(player_id=np.arange(1, len(keys) + 1))
+        
+        self.seasons = [season for season, _ in season_frames]
+        self.feature_means = scaler.mean_
+        self.feature_scales = scaler.scale_
+        self.features = trajectories
+        self.mask = mask
+        self.players = PlayerStore.from_dataframe(latest)
+        self.player_ids = np.full(len(keys), -1, dtype=np.int64)
+        self.is_trained = True
+        
+        print(f"📈 Trajectory model: {len(keys)} players over {len(self.seasons)} seasons "
+              f"({', '.join(self.seasons)}), {mask.sum()} player-seasons")
+    
+    def link_player_ids(self, players):
+        """
+        Take each player's id from the serving catalog, so responses link to /players/<id>.
+        
+        Players are matched by name and team; those not in the catalog (e.g.
+        whose latest season is an older one) keep -1.
+        
+        Args:
+            players (PlayerStore): Player store of the serving model
+        """
+        catalog_ids = {
+            (name.lower(), team): player_id
+            for name, team, player_id in zip(players.names, players.column('team'), players.column('player_id'))
+        }
+        self.player_ids = np.array([
+            catalog_ids.get((name.lower(), team), -1)
+            for name, team in zip(self.players.names, self.players.column('team'))
+        ], dtype=np.int64)
+    
+    def serving_player_id(self, player_index):
+        """
+        Serving-catalog player_id of a player.
+        
+        Returns:
+            int or None: None if the player is not in the serving catalog
+        """
+        player_id = int(self.player_ids[player_index])
+        return player_id if player_id >= 0 else None
+    
+    def find_index_by_name(self, player_name):
+        """
+        Find a player by name.
+        
+        Returns:
+            int or None: Row index, or None if not found
+        """
+        return self.players.find_by_name(player_name)
+    
+    def player_seasons(self, player_index):
+        """Seasons a player has data for."""
+        return [self.seasons[i] for i in np.flatnonzero(self.mask[player_index]).tolist()]
+    
+    def get_similar_trajectories(self, player_index, window=3, top_n=5, align='recent'):
+        """
+        Find players whose trajectory over `window` seasons resembles a player's latest one.
+        
+        The query window is the player's last `window` seasons, which must all
+        have data. Candidate windows must have data in every season too; the
+        score is the mean per-season cosine similarity. With align='recent'
+        candidates are compared over the same calendar seasons; with
+        align='any' every window of their career is scored and the best one
+        is kept (e.g. a veteran whose first seasons match a youngster's).
+        
+        Args:
+            player_index (int): Row index of the query player
+            window (int): Number of consecutive seasons compared
+            top_n (int): Number of players to return
+            align (str): 'recent' or 'any'
+        
+        Returns:
+            tuple: (query_start, matches); query_start is the query window's
+                first season number, matches a list of (player_index, score,
+                window_start, per-season scores) by descending score
+        
+        Raises:
+            ValueError: Invalid window or alignment, or the player lacks `window` seasons
+        """
+        if not self.is_trained:
+            raise ValueError("Model not trained. Call train() first.")
+        if align not in ALIGNMENTS:
+            raise ValueError(f"Unknown alignment '{align}'. Use one of: {', '.join(ALIGNMENTS)}")
+        if not 1 <= window <= len(self.seasons):
+            raise ValueError(f"'window' must be between 1 and {len(self.seasons)} (seasons loaded)")
+        
+        query_end = int(np.flatnonzero(self.mask[player_index])[-1]) + 1
+        query_start = query_end - window
+        if query_start < 0 or not self.mask[player_index, query_start:query_end].all():
+            raise ValueError(
+                f"{self.players.names[player_index]} does not have {window} consecutive seasons "
+                f"up to {self.seasons[query_end - 1]}"
+            )
+        query = self.features[player_index, query_start:query_end]
+        
+        with metrics.stage('trajectory.score'):
+            if align == 'recent':
+                windows = self.features[:, None, query_start:query_end]
+                window_masks = self.mask[:, None, query_start:query_end]
+                window_starts = np.array([query_start])
+            else:
+                # Views, not copies: (num_players, num_windows, window, num_features)
+                windows = np.moveaxis(np.lib.stride_tricks.sliding_window_view(self.features, window, axis=1), -1, 2)
+                window_masks = np.lib.stride_tricks.sliding_window_view(self.mask, window, axis=1)
+                window_starts = np.arange(len(self.seasons) - window + 1)
+            
+            season_scores = np.einsum('nowf,wf->now', windows, query)
+            scores = season_scores.mean(axis=2)
+            scores[~window_masks.all(axis=2)] = -np.inf
+            scores[player_index] = -np.inf
+            
+            best_windows = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(scores)), best_windows]
+        
+        candidates = np.flatnonzero(np.isfinite(best_scores))
+        if len(candidates) > top_n:
+            candidates = candidates[np.argpartition(-best_scores[candidates], top_n - 1)[:top_n]]
+        candidates = candidates[np.argsort(-best_scores[candidates], kind='stable')]
+        
+        matches = [
+            (index, float(best_scores[index]), int(window_starts[best_windows[index]]),
+             season_scores[index, best_windows[index]].tolist())
+            for index in candidates.tolist()
+        ]
+        return query_start, matches
+    
+    def memory_usage(self):
+        """Approximate bytes held by the trajectory arrays and player store."""
+        if not self.is_trained:
+            return 0
+        return (self.features.nbytes + self.mask.nbytes + self.player_ids.nbytes
+                + sum(self.players.memory_usage().values()))
@@ -1,7 +1,9 @@
 import streamlit as st
 import requests
 import json
+import os
 import pandas as pd
+from requests.adapters import HTTPAdapter
 
 # Configure page
 st.set_page_config(
@@ -48,52 +50,115 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # API Configuration
-API_BASE_URL = "http://localhost:5000"
+API_BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:5000")
+
+# "http" talks to the Flask API; "local" loads the model into this process
+BACKEND_MODE = os.environ.get("SIMILARITY_BACKEND", "http")
+MODEL_PATH = os.environ.get("MODEL_PATH", "data/similarity_model.npz")
+DATA_PATH = "data/premier_league_data_converted.csv"
+REQUEST_TIMEOUT = 10  # seconds
 
 # Helper Functions
+@st.cache_resource
+def get_http_session():
+    """Shared keep-alive session so reruns reuse pooled TCP connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class ApiError(Exception):
+    """The API could not serve a request; raised out of cached functions so failures are never cached"""
+
+class ApiWarmingUpError(ApiError):
+    """The API is up but still loading its model (503)"""
+
+@st.cache_resource
+def get_local_model():
+    """Load (or train) the similarity model once per Streamlit process"""
+    from src.model import PlayerSimilarityModel
+    from src.registry import artifact_is_fresh
+    
+    model = PlayerSimilarityModel()
+    if artifact_is_fresh(MODEL_PATH, DATA_PATH):
+        model.load(MODEL_PATH)
+    else:
+        from src.data_loader import load_real_data
+        model.train(load_real_data())
+    return model
+
 @st.cache_data
+def fetch_players():
+    """Fetch all players from the API (or the in-process model); raises ApiError on failure"""
+    if BACKEND_MODE == "local":
+        from src.responses import build_player_list
+        return build_player_list(get_local_model().players)
+    
+    response = get_http_session().get(f"{API_BASE_URL}/players", timeout=REQUEST_TIMEOUT)
+    if response.status_code == 503:
+        raise ApiWarmingUpError("⏳ API is warming up. Refresh in a few seconds.")
+    if response.status_code != 200:
+        raise ApiError(f"Failed to fetch players: {response.status_code}")
+    return response.json()["players"]
+
 def get_players():
-    """Fetch all players from the API"""
+    """All players, or [] after showing why they could not be fetched (the next rerun retries)"""
     try:
-        response = requests.get(f"{API_BASE_URL}/players")
-        if response.status_code == 200:
-            return response.json()["players"]
-        else:
-            st.error(f"Failed to fetch players: {response.status_code}")
-            return []
+        return fetch_players()
+    except ApiWarmingUpError as e:
+        st.info(str(e))
+    except ApiError as e:
+        st.error(str(e))
     except requests.exceptions.ConnectionError:
         st.error("🔌 Cannot connect to API. Make sure Flask app is running!")
-        st.info("Run: `python app.py` in your terminal")
-        return []
+        st.info("Run: `python main.py` in your terminal")
+    return []
 
 @st.cache_data
-def get_player_details(player_id):
-    """Fetch detailed stats for a specific player"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/players/{player_id}")
-        if response.status_code == 200:
-            result = response.json()
-            if result.get("success"):
-                return result["player"]
-        return None
-    except Exception as e:
-        st.error(f"API Error: {e}")
-        return None
+def fetch_player_overview(player_id, top_n=5):
+    """
+    Fetch a player's detailed stats and their most similar players together.
+    
+    One API request (`/players/<id>?similar=N`) instead of separate detail
+    and similarity calls; results are cached per (player, top_n). Failures
+    raise ApiError (or a requests exception) so they are not cached.
+    """
+    if BACKEND_MODE == "local":
+        from src.responses import ALGORITHM_INFO, format_player_details, format_similar_players
+        model = get_local_model()
+        player_index = model.get_index_by_id(player_id)
+        if player_index is None:
+            return None
+        return {
+            "player": format_player_details(model.get_player(player_index)),
+            "similar_players": format_similar_players(model, model.get_similar_players(player_index, top_n)),
+            "algorithm_info": ALGORITHM_INFO
+        }
+    
+    response = get_http_session().get(
+        f"{API_BASE_URL}/players/{player_id}",
+        params={"similar": top_n},
+        timeout=REQUEST_TIMEOUT
+    )
+    if response.status_code == 503:
+        raise ApiWarmingUpError("⏳ API is warming up. Refresh in a few seconds.")
+    result = response.json()
+    if response.status_code != 200 or not result.get("success"):
+        raise ApiError(f"Error finding similar players: {result.get('error', 'Unknown error')}")
+    return result
 
-def get_similar_players(player_name, top_n=5):
-    """Find similar players"""
+def get_player_overview(player_id, top_n=5):
+    """A player's overview, or None after showing why it could not be fetched"""
     try:
-        # URL encode the player name
-        encoded_name = requests.utils.quote(player_name)
-        response = requests.get(f"{API_BASE_URL}/similar/{encoded_name}?top_n={top_n}")
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Error finding similar players: {response.json().get('error', 'Unknown error')}")
-            return None
+        return fetch_player_overview(player_id, top_n)
+    except ApiWarmingUpError as e:
+        st.info(str(e))
+    except ApiError as e:
+        st.error(str(e))
     except Exception as e:
-        st.error(f"Connection error: {e}")
-        return None
+        st.error(f"API Error: {e}")
+    return None
 
 # Main App
 def main():
@@ -110,7 +175,8 @@ def main():
     
     if not players:
         st.warning("⚠️ No players available. Make sure the Flask API is running.")
-        st.info("💡 **To start the API:**\n1. Open terminal\n2. Run: `python app.py`\n3. Refresh this page")
+        st.info("💡 **To start the API:**\n1. Open terminal\n2. Run: `python main.py`\n3. Refresh this page\n\n"
+                "Or run without the API: `SIMILARITY_BACKEND=local streamlit run streamlit_app.py`")
         return
     
     # Player selection
@@ -161,23 +227,22 @@ def main():
             <hr>
             """, unsafe_allow_html=True)
             
-            # Try to get detailed player stats
-            player_details = get_player_details(selected_player["player_id"])
+            # Details and neighbours arrive in one (cached) request
+            overview = get_player_overview(selected_player["player_id"], top_n)
+            player_details = overview["player"] if overview else None
             
             if player_details:
                 # Add detailed stats if available
                 try:
-                    # Handle different possible field names and missing values
-                    goals = player_details.get('goals', player_details.get('Gls', 'N/A'))
-                    assists = player_details.get('assists', player_details.get('Ast', 'N/A'))
+                    basic_stats = player_details.get('basic_stats', {})
+                    advanced_stats = player_details.get('advanced_stats', {})
                     
-                    # Handle minutes played
-                    minutes = player_details.get('minutes_played', 
-                             player_details.get('Min', 
-                             player_details.get('minutes', 0)))
+                    goals = basic_stats.get('goals', 'N/A')
+                    assists = basic_stats.get('assists', 'N/A')
+                    minutes = basic_stats.get('minutes_played', 0)
                     
                     # Show progressive stats instead of fake pass accuracy
-                    prog_passes = player_details.get('progressive_passes_per_90', 'N/A')
+                    prog_passes = advanced_stats.get('progressive_passes_per_90', 'N/A')
                     
                     st.markdown(f"""
                     <p><strong>Goals:</strong> {goals}</p>
@@ -202,6 +267,7 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
         else:
+            overview = None
             st.markdown(f"""
             <p><strong>Error:</strong> Player not found in list</p>
             </div>
@@ -213,7 +279,7 @@ def main():
         
         if find_similar:
             with st.spinner("🔄 Finding similar players..."):
-                similarity_data = get_similar_players(selected_player_name, top_n)
+                similarity_data = overview
                 
                 if similarity_data:
                     st.success(f"✅ Found {len(similarity_data['similar_players'])} similar players!")